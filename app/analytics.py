@@ -1,56 +1,73 @@
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly
 import pandas as pd
+import numpy as np
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from plotly.offline import get_plotlyjs
+from app import analytics_queries, assets, chart_summaries
 
 # 🎨 Apple-inspired playful colors
 APPLE_PALETTE = ["#1f77b4", "#d62728", "#ffbf00", "#2ca02c"]  # blue, red, yellow, green
 
+CHART_CACHE_SIZE = 48
 
-def _wrap_chart(fig, title: str):
-    """Wrap chart in a full iMac-style frame (bezel, chin, neck, foot) that expands on mobile for readability."""
-    fig_html = fig.to_html(include_plotlyjs="cdn", full_html=False, config={"responsive": True})
+# "single": every chart in one component with plotly.js loaded once from the local bundle.
+# "frames": the original one-component-per-chart layout, each pulling plotly.js from the CDN.
+DASHBOARD_MODE = os.getenv("DASHBOARD_MODE", "single")
 
-    html = f"""
+
+_IMAC_CSS = """
     <style>
-        .imac-wrapper {{
+        .imac-wrapper {
             display: flex;
             justify-content: center;
             margin: 40px auto;
             width: 100%;
-        }}
+        }
 
-        .imac-frame {{
+        .imac-frame {
             display: flex; 
             flex-direction: column; 
             align-items: center; 
             width: 90%;
             max-width: 1100px;
-        }}
+        }
 
         /* 📱 On mobile, let frame expand wider & taller */
-        @media (max-width: 768px) {{
-            .imac-frame {{
+        @media (max-width: 768px) {
+            .imac-frame {
                 width: 100%;
                 max-width: 100%;
-            }}
-            .imac-frame .chart-container {{
+            }
+            .imac-frame .chart-container {
                 height: 480px !important;
                 overflow-x: auto; /* allow scroll for wide charts */
-            }}
-        }}
+            }
+        }
 
-        @media (max-width: 480px) {{
-            .imac-frame {{
+        @media (max-width: 480px) {
+            .imac-frame {
                 width: 100%;
                 max-width: 100%;
-            }}
-            .imac-frame .chart-container {{
+            }
+            .imac-frame .chart-container {
                 height: 520px !important;
                 overflow-x: auto;
-            }}
-        }}
+            }
+        }
     </style>
+"""
+
+
+def _imac_frame(fig_html: str) -> str:
+    """Full iMac-style frame (bezel, chin, neck, foot) around one chart; expands on mobile for readability."""
+    return f"""
 
     <div class="imac-wrapper">
       <div class="imac-frame">
@@ -106,7 +123,31 @@ def _wrap_chart(fig, title: str):
       </div>
     </div>
     """
-    return html
+
+
+def _wrap_chart(fig, title: str):
+    """Wrap chart in a full iMac-style frame as a standalone document that loads plotly.js from the CDN."""
+    fig_html = fig.to_html(include_plotlyjs="cdn", full_html=False, config={"responsive": True})
+    return _IMAC_CSS + _imac_frame(fig_html)
+
+
+@functools.lru_cache(maxsize=1)
+def _plotly_js_tag() -> str:
+    """
+    <script> tag for the plotly.js bundled with the plotly package, so the
+    dashboard needs no external network. Served as a static file the browser
+    can cache when static serving is enabled, inlined otherwise.
+    """
+    if st.get_option("server.enableStaticServing"):
+        url = assets.write_static_file(f"plotly-{plotly.__version__}.min.js", get_plotlyjs().encode("utf-8"))
+        return f'<script src="{url}"></script>'
+    return f"<script>{get_plotlyjs()}</script>"
+
+
+def _dashboard_document(fragments, frame_height: int) -> str:
+    """All chart frames in one document: plotly.js and the frame CSS appear once."""
+    slots = "".join(f'<div style="height:{frame_height}px;">{fragment}</div>' for fragment in fragments)
+    return _plotly_js_tag() + _IMAC_CSS + slots
 
 
 def _apply_layout(fig, title: str):
@@ -133,142 +174,223 @@ def _apply_layout(fig, title: str):
     )
 
 
-def show_charts(df: pd.DataFrame):
-    if df.empty:
-        st.info("No data for charts yet!")
-        return
+# =====================
+# Chart Builders
+# =====================
+# Each builder turns one aggregate frame from analytics_queries into a styled figure.
 
-    dfx = df.copy()
-    dfx["year"] = pd.to_numeric(dfx["year"], errors="coerce").astype("Int64")
-    dfx["rating"] = pd.to_numeric(dfx["rating"], errors="coerce")
-    dfx["genre"] = dfx["genre"].fillna("Unknown")
-    dfx["author"] = dfx["author"].fillna("Unknown")
-
-    st.subheader("Computer Lab Dashboard")
+def _fig_books_per_year(by_year):
+    fig = px.bar(by_year, x="year", y="Books", color="Books", color_continuous_scale=APPLE_PALETTE)
+    _apply_layout(fig, "Books per Year")
+    return fig
 
-    frame_height = 860  # taller frame
 
-    # Books per Year (Bar Chart)
-    by_year = dfx.dropna(subset=["year"]).groupby("year").size().reset_index(name="Books")
-    by_year = by_year[by_year["year"] == by_year["year"].astype(int)]
-    if not by_year.empty:
-        if st.session_state.get("is_mobile", False):
-            by_year = by_year.tail(10)
-        fig1 = px.bar(by_year, x="year", y="Books", color="Books", color_continuous_scale=APPLE_PALETTE)
-        _apply_layout(fig1, "Books per Year")
-        st.components.v1.html(_wrap_chart(fig1, "Books per Year"), height=frame_height, scrolling=False)
-
-    # Books per Genre (Sunburst)
+def _fig_books_per_genre(by_genre):
     # Mobile tweaks: fewer slices, larger font via uniformtext, outside labels for readability.
-    by_genre = dfx.groupby("genre").size().reset_index(name="Books").sort_values("Books", ascending=False)
-    if not by_genre.empty:
-        if st.session_state.get("is_mobile", False):
-            by_genre = by_genre.head(10)  # limit clutter on small screens
-        fig2 = px.sunburst(
-            by_genre,
-            path=["genre"],
-            values="Books",
-            color="Books",
-            color_continuous_scale=APPLE_PALETTE
-        )
-        fig2.update_traces(
-            insidetextorientation="radial",
-            textinfo="label+percent entry",
-            hovertemplate="<b>%{label}</b><br>Books: %{value}<extra></extra>"
+    fig = px.sunburst(
+        by_genre,
+        path=["genre"],
+        values="Books",
+        color="Books",
+        color_continuous_scale=APPLE_PALETTE
+    )
+    fig.update_traces(
+        insidetextorientation="radial",
+        textinfo="label+percent entry",
+        hovertemplate="<b>%{label}</b><br>Books: %{value}<extra></extra>"
+    )
+    fig.update_layout(uniformtext_minsize=12, uniformtext_mode="hide")
+    _apply_layout(fig, "Books per Genre (Sunburst)")
+    return fig
+
+
+def _fig_avg_rating_by_genre(by_genre_rating):
+    fig = px.bar(by_genre_rating, x="genre", y="rating", color="rating",
+                 color_continuous_scale=APPLE_PALETTE, text="rating")
+    fig.update_traces(
+        texttemplate="%{text:.2f}",
+        textposition="outside",
+        textfont=dict(size=12),
+        cliponaxis=False
+    )
+    fig.update_yaxes(range=[0, 5.5])
+    _apply_layout(fig, "Average Rating by Genre")
+    return fig
+
+
+def _fig_top_authors(by_author):
+    # Build a lollipop: line from x=0 to x=Books for each author, and a circle at the end
+    fig = go.Figure()
+
+    authors_order = list(by_author["author"])[::-1]  # reverse for nicer top-down layout
+    by_author_sorted = by_author.set_index("author").loc[authors_order].reset_index()
+
+    # stems (lines), all drawn as one trace
+    stem_x, stem_y = chart_summaries.segments(
+        [0] * len(by_author_sorted), by_author_sorted["Books"].tolist(),
+        by_author_sorted["author"].tolist(), by_author_sorted["author"].tolist(),
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=stem_x,
+            y=stem_y,
+            mode="lines",
+            line=dict(color=APPLE_PALETTE[0], width=4),
+            showlegend=False
         )
-        fig2.update_layout(uniformtext_minsize=12, uniformtext_mode="hide")
-        _apply_layout(fig2, "Books per Genre (Sunburst)")
-        st.components.v1.html(_wrap_chart(fig2, "Books per Genre (Sunburst)"), height=frame_height, scrolling=False)
-
-    # Average Rating by Genre (Bar Chart w/ labels)
-    rated = dfx.dropna(subset=["rating"])
-    by_genre_rating = rated.groupby("genre")["rating"].mean().reset_index().sort_values("rating", ascending=False)
-    if not by_genre_rating.empty:
-        if st.session_state.get("is_mobile", False):
-            by_genre_rating = by_genre_rating.head(8)
-        fig3 = px.bar(by_genre_rating, x="genre", y="rating", color="rating",
-                      color_continuous_scale=APPLE_PALETTE, text="rating")
-        fig3.update_traces(
-            texttemplate="%{text:.2f}",
-            textposition="outside",
-            textfont=dict(size=12),
-            cliponaxis=False
+    )
+    # lollipop heads (markers + label)
+    fig.add_trace(
+        go.Scatter(
+            x=by_author_sorted["Books"],
+            y=by_author_sorted["author"],
+            mode="markers+text",
+            marker=dict(size=18, color=APPLE_PALETTE[1], line=dict(color="white", width=2)),
+            text=by_author_sorted["Books"],
+            textposition="middle right",
+            textfont=dict(size=14, color="white"),
+            showlegend=False
         )
-        fig3.update_yaxes(range=[0, 5.5])
-        _apply_layout(fig3, "Average Rating by Genre")
-        st.components.v1.html(_wrap_chart(fig3, "Average Rating by Genre"), height=frame_height, scrolling=False)
-
-    # Top 5 Authors (Lollipop Chart: stems + circle markers)
-    by_author = dfx.groupby("author").size().reset_index(name="Books").sort_values("Books", ascending=False).head(5)
-    if not by_author.empty:
-        # Build a lollipop: line from x=0 to x=Books for each author, and a circle at the end
-        fig4 = go.Figure()
-
-        authors_order = list(by_author["author"])[::-1]  # reverse for nicer top-down layout
-        by_author_sorted = by_author.set_index("author").loc[authors_order].reset_index()
-
-        # stems (lines)
-        for _, r in by_author_sorted.iterrows():
-            fig4.add_trace(
-                go.Scatter(
-                    x=[0, r["Books"]],
-                    y=[r["author"], r["author"]],
-                    mode="lines",
-                    line=dict(color=APPLE_PALETTE[0], width=4),
-                    showlegend=False
-                )
-            )
-        # lollipop heads (markers + label)
-        fig4.add_trace(
+    )
+
+    fig.update_yaxes(categoryorder="array", categoryarray=authors_order)
+    fig.update_xaxes(range=[0, max(by_author_sorted["Books"]) * 1.2])  # little breathing room
+    _apply_layout(fig, "Top 5 Authors by Book Count (Lollipop)")
+    return fig
+
+
+def _fig_ratings_histogram(distribution):
+    # Binned here; the browser only receives 20 bars
+    centers, counts = chart_summaries.histogram(
+        distribution["rating"].to_numpy(float), distribution["books"].to_numpy(float), bins=20, value_range=(0, 5)
+    )
+    fig = go.Figure(go.Bar(x=centers, y=counts, width=5 / 20, marker_color=APPLE_PALETTE[0], opacity=0.9))
+    fig.update_layout(bargap=0)
+    fig.update_xaxes(range=[0, 5], title_text="rating")
+    fig.update_yaxes(title_text="count")
+    _apply_layout(fig, "Ratings Distribution (Histogram)")
+    return fig
+
+
+def _fig_ratings_violin(distribution):
+    # KDE outlines and quartiles are computed here, so the payload is bounded by the number of genres
+    summaries = chart_summaries.violin_summaries(
+        distribution["genre"].to_numpy(object),
+        distribution["rating"].to_numpy(float),
+        distribution["books"].to_numpy(float),
+    )
+    fig = go.Figure()
+    half_width = 0.4
+    for i, summary in enumerate(summaries):
+        color = APPLE_PALETTE[i % len(APPLE_PALETTE)]
+        scale = half_width / summary["density"].max()
+        outline_x = np.concatenate([i - summary["density"] * scale, (i + summary["density"] * scale)[::-1]])
+        outline_y = np.concatenate([summary["grid"], summary["grid"][::-1]])
+        fig.add_trace(
             go.Scatter(
-                x=by_author_sorted["Books"],
-                y=by_author_sorted["author"],
-                mode="markers+text",
-                marker=dict(size=18, color=APPLE_PALETTE[1], line=dict(color="white", width=2)),
-                text=by_author_sorted["Books"],
-                textposition="middle right",
-                textfont=dict(size=14, color="white"),
-                showlegend=False
+                x=np.round(outline_x, 4), y=np.round(outline_y, 4),
+                mode="lines", fill="toself", name=summary["group"],
+                line=dict(color=color, width=1.5), opacity=0.6,
+                hoverinfo="name"
             )
         )
+    fig.add_trace(
+        go.Box(
+            x=list(range(len(summaries))),
+            q1=[sm["q1"] for sm in summaries],
+            median=[sm["median"] for sm in summaries],
+            q3=[sm["q3"] for sm in summaries],
+            lowerfence=[sm["lowerfence"] for sm in summaries],
+            upperfence=[sm["upperfence"] for sm in summaries],
+            width=0.1, fillcolor="rgba(255,255,255,0.25)", line=dict(color="white", width=1),
+            showlegend=False, hoverinfo="y"
+        )
+    )
+    fig.update_xaxes(tickvals=list(range(len(summaries))), ticktext=[sm["group"] for sm in summaries],
+                     title_text="genre")
+    fig.update_yaxes(range=[0, 5], title_text="rating")
+    _apply_layout(fig, "Ratings Distribution (Violin)")
+    return fig
 
-        fig4.update_yaxes(categoryorder="array", categoryarray=authors_order)
-        fig4.update_xaxes(range=[0, max(by_author_sorted["Books"]) * 1.2])  # little breathing room
-        _apply_layout(fig4, "Top 5 Authors by Book Count (Lollipop)")
-        st.components.v1.html(_wrap_chart(fig4, "Top 5 Authors by Book Count (Lollipop)"), height=frame_height, scrolling=False)
-
-    # Ratings Distribution (Desktop: Violin, Mobile: Histogram)
-    if not rated.empty:
-        is_mobile = st.session_state.get("is_mobile", False)
-        if is_mobile:
-            fig5 = px.histogram(rated, x="rating", nbins=20,
-                                color_discrete_sequence=APPLE_PALETTE, opacity=0.9)
-            fig5.update_xaxes(range=[0, 5])
-            _apply_layout(fig5, "Ratings Distribution (Histogram)")
-            st.components.v1.html(_wrap_chart(fig5, "Ratings Distribution (Histogram)"), height=frame_height, scrolling=False)
-        else:
-            rated_for_violin = rated.copy()
-            fig5 = px.violin(
-                rated_for_violin,
-                x="genre",
-                y="rating",
-                box=True,
-                points=False,
-                color="genre",
-                color_discrete_sequence=APPLE_PALETTE
-            )
-            fig5.update_yaxes(range=[0, 5])
-            _apply_layout(fig5, "Ratings Distribution (Violin)")
-            st.components.v1.html(_wrap_chart(fig5, "Ratings Distribution (Violin)"), height=frame_height, scrolling=False)
-
-    # Average Rating by Year (Line Chart)
-    by_year_rating = rated.dropna(subset=["year"]).groupby("year")["rating"].mean().reset_index().sort_values("year")
-    by_year_rating = by_year_rating[by_year_rating["year"] == by_year_rating["year"].astype(int)]
-    if not by_year_rating.empty:
-        if st.session_state.get("is_mobile", False):
-            by_year_rating = by_year_rating.tail(10)
-        fig6 = px.line(by_year_rating, x="year", y="rating", markers=True)
-        fig6.update_traces(line=dict(color="#1f77b4"), marker=dict(color="#d62728", size=10))
-        fig6.update_yaxes(range=[0, 5])
-        _apply_layout(fig6, "Average Rating by Year")
-        st.components.v1.html(_wrap_chart(fig6, "Average Rating by Year"), height=frame_height, scrolling=False)
+
+def _fig_avg_rating_by_year(by_year_rating):
+    fig = px.line(by_year_rating, x="year", y="rating", markers=True)
+    fig.update_traces(line=dict(color="#1f77b4"), marker=dict(color="#d62728", size=10))
+    fig.update_yaxes(range=[0, 5])
+    _apply_layout(fig, "Average Rating by Year")
+    return fig
+
+# =====================
+# Rendered Chart Cache
+# =====================
+# Finished iMac-frame HTML, shared by every session in the process. A hit skips
+# figure construction and serialization entirely.
+
+_chart_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_chart_cache_lock = threading.Lock()
+
+
+def _fingerprint(data: pd.DataFrame) -> str:
+    digest = hashlib.sha1("|".join(map(str, data.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _chart_html(chart_id: str, title: str, data: pd.DataFrame, is_mobile: bool, build,
+                mode: str = DASHBOARD_MODE) -> str:
+    """Standalone framed chart in "frames" mode; a frame fragment without plotly.js in "single" mode."""
+    key = (chart_id, _fingerprint(data), is_mobile, mode)
+    with _chart_cache_lock:
+        if key in _chart_cache:
+            _chart_cache.move_to_end(key)
+            return _chart_cache[key]
+    fig = build(data)
+    if mode == "single":
+        html = _imac_frame(fig.to_html(include_plotlyjs=False, full_html=False, config={"responsive": True}))
+    else:
+        html = _wrap_chart(fig, title)
+    with _chart_cache_lock:
+        _chart_cache[key] = html
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+    return html
+
+
+def show_charts():
+    if analytics_queries.library_size() == 0:
+        st.info("No data for charts yet!")
+        return
+
+    st.subheader("Computer Lab Dashboard")
+
+    frame_height = 860  # taller frame
+    is_mobile = st.session_state.get("is_mobile", False)
+
+    charts = [
+        ("books_per_year", "Books per Year",
+         analytics_queries.books_per_year(10 if is_mobile else None), _fig_books_per_year),
+        # limit clutter on small screens
+        ("books_per_genre", "Books per Genre (Sunburst)",
+         analytics_queries.books_per_genre(10 if is_mobile else None), _fig_books_per_genre),
+        ("avg_rating_by_genre", "Average Rating by Genre",
+         analytics_queries.avg_rating_by_genre(8 if is_mobile else None), _fig_avg_rating_by_genre),
+        ("top_authors", "Top 5 Authors by Book Count (Lollipop)",
+         analytics_queries.top_authors(5), _fig_top_authors),
+        # Desktop: Violin, Mobile: Histogram
+        ("ratings_histogram", "Ratings Distribution (Histogram)",
+         analytics_queries.rating_distribution(), _fig_ratings_histogram) if is_mobile else
+        ("ratings_violin", "Ratings Distribution (Violin)",
+         analytics_queries.rating_distribution(), _fig_ratings_violin),
+        ("avg_rating_by_year", "Average Rating by Year",
+         analytics_queries.avg_rating_by_year(10 if is_mobile else None), _fig_avg_rating_by_year),
+    ]
+
+    rendered = [_chart_html(chart_id, title, data, is_mobile, build)
+                for chart_id, title, data, build in charts if not data.empty]
+
+    if DASHBOARD_MODE == "single":
+        st.components.v1.html(_dashboard_document(rendered, frame_height),
+                              height=frame_height * len(rendered), scrolling=False)
+    else:
+        for html in rendered:
+            st.components.v1.html(html, height=frame_height, scrolling=False)
@@ -0,0 +1,127 @@
+import functools
+import threading
+from typing import Optional
+import pandas as pd
+from app import db_utils
+
+# =====================
+# Dashboard Aggregates
+# =====================
+# Every chart on the Computer Lab Dashboard is drawn from one of these small
+# frames. Each is computed with an indexed GROUP BY and cached until
+# db_utils.data_version() changes. Callers must not modify the returned frames.
+
+def _cached_until_change(fn):
+    cache = {}
+    lock = threading.Lock()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        version = db_utils.data_version()
+        with lock:
+            hit = cache.get(key)
+            if hit is not None and hit[0] == version:
+                return hit[1]
+        result = fn(*args, **kwargs)
+        with lock:
+            cache[key] = (version, result)
+        return result
+
+    wrapper.cache_clear = cache.clear
+    return wrapper
+
+def _query(sql: str, params: tuple = ()) -> pd.DataFrame:
+    with db_utils.connection() as conn:
+        return pd.read_sql(sql, conn, params=params)
+
+def _limit(limit: Optional[int]) -> int:
+    return -1 if limit is None else int(limit)
+
+@_cached_until_change
+def library_size() -> int:
+    with db_utils.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+@_cached_until_change
+def books_per_year(latest: Optional[int] = None) -> pd.DataFrame:
+    """Books read per year, oldest first. latest keeps only the most recent N years."""
+    df = _query("""
+        SELECT year, COUNT(*) AS Books
+        FROM books
+        WHERE year IS NOT NULL
+        GROUP BY year
+        ORDER BY year DESC
+        LIMIT ?
+    """, (_limit(latest),))
+    df = df.iloc[::-1].reset_index(drop=True)
+    return df.astype({"year": "Int64", "Books": "int64"})
+
+@_cached_until_change
+def books_per_genre(limit: Optional[int] = None) -> pd.DataFrame:
+    df = _query("""
+        SELECT COALESCE(g.name, 'Unknown') AS genre, COUNT(*) AS Books
+        FROM books b
+        LEFT JOIN genres g ON b.genre_id = g.id
+        GROUP BY 1
+        ORDER BY Books DESC, genre
+        LIMIT ?
+    """, (_limit(limit),))
+    return df.astype({"Books": "int64"})
+
+@_cached_until_change
+def avg_rating_by_genre(limit: Optional[int] = None) -> pd.DataFrame:
+    """Mean of per-book average ratings for each genre, highest first."""
+    df = _query("""
+        SELECT COALESCE(g.name, 'Unknown') AS genre, AVG(ROUND(s.rating_mean, 2)) AS rating
+        FROM books b
+        JOIN book_rating_stats s ON b.id = s.book_id
+        LEFT JOIN genres g ON b.genre_id = g.id
+        GROUP BY 1
+        ORDER BY rating DESC, genre
+        LIMIT ?
+    """, (_limit(limit),))
+    return df.astype({"rating": "float64"})
+
+@_cached_until_change
+def top_authors(limit: int = 5) -> pd.DataFrame:
+    df = _query("""
+        SELECT COALESCE(a.name, 'Unknown') AS author, COUNT(*) AS Books
+        FROM books b
+        LEFT JOIN authors a ON b.author_id = a.id
+        GROUP BY 1
+        ORDER BY Books DESC, author
+        LIMIT ?
+    """, (int(limit),))
+    return df.astype({"Books": "int64"})
+
+@_cached_until_change
+def rating_distribution() -> pd.DataFrame:
+    """
+    Count of rated books per (genre, average rating). Ratings are stored at
+    0.01 precision on the dashboard, so this is lossless but bounded by
+    genres x distinct ratings instead of by library size.
+    """
+    df = _query("""
+        SELECT COALESCE(g.name, 'Unknown') AS genre, ROUND(s.rating_mean, 2) AS rating, COUNT(*) AS books
+        FROM books b
+        JOIN book_rating_stats s ON b.id = s.book_id
+        LEFT JOIN genres g ON b.genre_id = g.id
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """)
+    return df.astype({"rating": "float64", "books": "int64"})
+
+@_cached_until_change
+def avg_rating_by_year(latest: Optional[int] = None) -> pd.DataFrame:
+    df = _query("""
+        SELECT b.year AS year, AVG(ROUND(s.rating_mean, 2)) AS rating
+        FROM books b
+        JOIN book_rating_stats s ON b.id = s.book_id
+        WHERE b.year IS NOT NULL
+        GROUP BY b.year
+        ORDER BY b.year DESC
+        LIMIT ?
+    """, (_limit(latest),))
+    df = df.iloc[::-1].reset_index(drop=True)
+    return df.astype({"year": "Int64", "rating": "float64"})
@@ -0,0 +1,54 @@
+import base64
+import functools
+import hashlib
+import io
+import os
+from typing import Optional
+import streamlit as st
+from PIL import Image
+
+# Same folder Streamlit serves at app/static/ (see .streamlit/config.toml)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+WEBP_QUALITY = 80
+
+# =====================
+# Static Image Assets
+# =====================
+
+def image_src(path: str, max_width: int) -> Optional[str]:
+    """
+    URL for a page image, resized to the width it is displayed at and re-encoded
+    as WebP. Returns None if the source image is missing. The work is done once
+    per process (and per source file change); browsers cache the static file.
+    """
+    if not os.path.exists(path):
+        return None
+    return _encoded_image(os.path.abspath(path), int(max_width), os.path.getmtime(path),
+                          bool(st.get_option("server.enableStaticServing")))
+
+@functools.lru_cache(maxsize=32)
+def _encoded_image(path: str, max_width: int, mtime: float, static_serving: bool) -> str:
+    with Image.open(path) as img:
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        if img.width > max_width:
+            img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, "WEBP", quality=WEBP_QUALITY, method=6)
+    data = buf.getvalue()
+
+    if not static_serving:
+        return "data:image/webp;base64," + base64.b64encode(data).decode()
+
+    stem = os.path.splitext(os.path.basename(path))[0].lower()
+    return write_static_file(f"{stem}-{max_width}-{hashlib.sha1(data).hexdigest()[:10]}.webp", data)
+
+def write_static_file(name: str, data: bytes) -> str:
+    """Write data to static/<name> once (atomically) and return the URL Streamlit serves it at."""
+    target = os.path.join(STATIC_DIR, name)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+    return f"app/static/{name}"
@@ -0,0 +1,87 @@
+import numpy as np
+from typing import Dict, List, Tuple, Sequence, Optional
+
+# =====================
+# Server-side Chart Summaries
+# =====================
+# Vectorized builders that reduce weighted samples (value, count) to the few
+# points a chart actually draws, so figure payloads don't grow with the library.
+
+KDE_POINTS = 100
+MIN_BANDWIDTH = 0.05
+
+
+def weighted_quantiles(values: np.ndarray, weights: np.ndarray, qs: Sequence[float]) -> np.ndarray:
+    """Quantiles of repeated values without expanding them (linear interpolation, like numpy)."""
+    order = np.argsort(values)
+    values, weights = values[order], weights[order]
+    # Positions 0..n-1 that each run of repeated values covers
+    upper = np.cumsum(weights) - 1
+    positions = np.asarray(qs, dtype=float) * (weights.sum() - 1)
+    lo = np.floor(positions)
+    frac = positions - lo
+    lo_vals = values[np.searchsorted(upper, lo)]
+    hi_vals = values[np.searchsorted(upper, np.minimum(lo + 1, upper[-1]))]
+    return lo_vals + (hi_vals - lo_vals) * frac
+
+
+def box_summary(values: np.ndarray, weights: np.ndarray) -> Dict[str, float]:
+    """Quartiles and Tukey fences (the whisker ends plotly draws by default)."""
+    q1, median, q3 = weighted_quantiles(values, weights, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        "q1": float(q1), "median": float(median), "q3": float(q3),
+        "lowerfence": float(inside.min()), "upperfence": float(inside.max()),
+    }
+
+
+def scott_bandwidth(values: np.ndarray, weights: np.ndarray) -> float:
+    total = weights.sum()
+    mean = np.dot(values, weights) / total
+    std = np.sqrt(np.dot(weights, (values - mean) ** 2) / total)
+    n_eff = total ** 2 / np.dot(weights, weights)
+    return max(float(std * n_eff ** -0.2), MIN_BANDWIDTH)
+
+
+def kde(values: np.ndarray, weights: np.ndarray, grid: np.ndarray,
+        bandwidth: Optional[float] = None) -> np.ndarray:
+    """Weighted Gaussian KDE evaluated on grid, as one (grid x values) matrix product."""
+    bw = bandwidth or scott_bandwidth(values, weights)
+    z = (grid[:, None] - values[None, :]) / bw
+    kernel = np.exp(-0.5 * z * z) / (bw * np.sqrt(2 * np.pi))
+    return kernel @ (weights / weights.sum())
+
+
+def histogram(values: np.ndarray, weights: np.ndarray, bins: int,
+              value_range: Tuple[float, float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Bin centers and counts."""
+    counts, edges = np.histogram(values, bins=bins, range=value_range, weights=weights)
+    return (edges[:-1] + edges[1:]) / 2, counts
+
+
+def violin_summaries(groups: np.ndarray, values: np.ndarray, weights: np.ndarray,
+                     value_range: Tuple[float, float] = (0.0, 5.0),
+                     points: int = KDE_POINTS) -> List[Dict]:
+    """
+    Per-group KDE outline and box summary from (group, value, count) rows.
+    Each outline spans the group's data plus two bandwidths, clipped to value_range.
+    """
+    summaries = []
+    for group in dict.fromkeys(groups):
+        mask = groups == group
+        v, w = values[mask].astype(float), weights[mask].astype(float)
+        bw = scott_bandwidth(v, w)
+        grid = np.linspace(max(v.min() - 2 * bw, value_range[0]), min(v.max() + 2 * bw, value_range[1]), points)
+        summaries.append({"group": group, "grid": grid, "density": kde(v, w, grid, bw), **box_summary(v, w)})
+    return summaries
+
+
+def segments(x0: Sequence, x1: Sequence, y0: Sequence, y1: Sequence) -> Tuple[list, list]:
+    """Line segments as one x/y series split by None gaps, so many segments draw as a single trace."""
+    n = len(x0)
+    xs = np.empty(3 * n, dtype=object)
+    ys = np.empty(3 * n, dtype=object)
+    xs[0::3], xs[1::3], xs[2::3] = x0, x1, None
+    ys[0::3], ys[1::3], ys[2::3] = y0, y1, None
+    return xs.tolist(), ys.tolist()
@@ -0,0 +1,60 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any
+import pandas as pd
+from app import db_utils, cover_store
+
+# Several workers so one slow provider response doesn't hold up the rest of the queue
+COVER_WORKERS = 4
+
+_pool = ThreadPoolExecutor(max_workers=COVER_WORKERS, thread_name_prefix="cover-worker")
+_pending = set()
+_lock = threading.Lock()
+
+# =====================
+# Background Cover Queue
+# =====================
+
+def request_cover(row) -> bool:
+    """
+    Queue a cover lookup for a book row and return immediately.
+    Returns False if a lookup for that book is already queued or running.
+    """
+    book_id = int(row["id"])
+    with _lock:
+        if book_id in _pending:
+            return False
+        _pending.add(book_id)
+    # Missing values come through pandas as NaN; the fetchers expect None
+    _pool.submit(_resolve, {k: (None if pd.isna(v) else v) for k, v in dict(row).items()})
+    return True
+
+def _resolve(row: Dict[str, Any]):
+    try:
+        # Writes the resolved cover back to the books table
+        db_utils.get_or_fetch_cover_for_row(row)
+    except Exception:
+        pass
+    finally:
+        with _lock:
+            _pending.discard(int(row["id"]))
+
+def pending_count() -> int:
+    with _lock:
+        return len(_pending)
+
+def request_store(url: str) -> bool:
+    """Queue downloading a remote cover into the local cover store. False if already queued."""
+    with _lock:
+        if url in _pending:
+            return False
+        _pending.add(url)
+    _pool.submit(_store, url)
+    return True
+
+def _store(url: str):
+    try:
+        cover_store.store(url)
+    finally:
+        with _lock:
+            _pending.discard(url)
@@ -0,0 +1,198 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Tuple, Iterable
+import streamlit as st
+from PIL import Image
+from app import assets, http_client
+
+COVER_INDEX_PATH = "cover_store.db"
+COVER_SUBDIR = "covers"
+
+# Widths each cover is kept at: grid tiles (about 2x their on-screen width) and the edit preview
+VARIANTS = {"grid": 320, "detail": 800}
+WEBP_QUALITY = 80
+MAX_STORE_BYTES = 256 * 1024 * 1024
+MAX_DOWNLOAD_BYTES = 10 * 1024 * 1024
+# Open Library answers unknown covers with a 1x1 image; anything this small counts as missing
+MIN_COVER_PIXELS = 16
+FAILED_RETRY_SECONDS = 24 * 3600
+# last_access is only rewritten when older than this, so most grid renders are read-only
+TOUCH_INTERVAL = 3600
+
+_db_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_conn_path: Optional[str] = None
+
+# =====================
+# Storage
+# =====================
+# Each remote cover_url is downloaded once and stored under static/covers/ by
+# the SHA-1 of the original image, so two URLs for the same picture share
+# files. covers maps url -> digest; a NULL digest records a failed download.
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(COVER_INDEX_PATH, check_same_thread=False, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS covers (
+            url TEXT PRIMARY KEY,
+            digest TEXT,
+            bytes INTEGER NOT NULL DEFAULT 0,
+            fetched_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_covers_digest ON covers(digest)")
+    conn.commit()
+    return conn
+
+@contextmanager
+def _connection():
+    """The process-wide cover index connection, opened (and the schema created) once per COVER_INDEX_PATH."""
+    global _conn, _conn_path
+    with _db_lock:
+        if _conn is None or _conn_path != COVER_INDEX_PATH:
+            if _conn is not None:
+                _conn.close()
+            _conn = _connect()
+            _conn_path = COVER_INDEX_PATH
+        try:
+            yield _conn
+        finally:
+            if _conn.in_transaction:
+                _conn.rollback()
+
+def _variant_name(digest: str, variant: str) -> str:
+    return f"{COVER_SUBDIR}/{digest[:2]}/{digest}-{variant}.webp"
+
+def _variant_path(digest: str, variant: str) -> str:
+    return os.path.join(assets.STATIC_DIR, *_variant_name(digest, variant).split("/"))
+
+def _storable(url) -> bool:
+    return isinstance(url, str) and url.startswith(("http://", "https://"))
+
+def _write_variants(data: bytes, digest: str) -> int:
+    """Write every size variant of an image and return their total size in bytes."""
+    total = 0
+    with Image.open(io.BytesIO(data)) as img:
+        if min(img.size) < MIN_COVER_PIXELS:
+            raise ValueError("image too small to be a cover")
+        img = img.convert("RGB")
+        for variant, width in VARIANTS.items():
+            path = _variant_path(digest, variant)
+            if not os.path.exists(path):
+                resized = img if img.width <= width else img.resize(
+                    (width, round(img.height * width / img.width)), Image.LANCZOS)
+                buf = io.BytesIO()
+                resized.save(buf, "WEBP", quality=WEBP_QUALITY, method=6)
+                assets.write_static_file(_variant_name(digest, variant), buf.getvalue())
+            total += os.path.getsize(path)
+    return total
+
+def _evict(conn: sqlite3.Connection) -> List[str]:
+    """Drop the least recently shown covers until the store fits MAX_STORE_BYTES. Returns their digests."""
+    rows = conn.execute("""
+        SELECT digest, MAX(bytes), MAX(last_access) FROM covers
+        WHERE digest IS NOT NULL
+        GROUP BY digest
+        ORDER BY 3
+    """).fetchall()
+    total = sum(size for _, size, _ in rows)
+    evicted = []
+    for digest, size, _ in rows:
+        if total <= MAX_STORE_BYTES:
+            break
+        conn.execute("DELETE FROM covers WHERE digest=?", (digest,))
+        evicted.append(digest)
+        total -= size
+    return evicted
+
+def _remove_files(digests: Iterable[str]):
+    for digest in digests:
+        for variant in VARIANTS:
+            try:
+                os.remove(_variant_path(digest, variant))
+            except FileNotFoundError:
+                pass
+
+# =====================
+# Public API
+# =====================
+
+def store(url: str) -> Optional[str]:
+    """
+    Download a cover once, write its variants and index it. Returns the
+    content digest, or None if the URL didn't give a usable image.
+    """
+    if not _storable(url):
+        return None
+    digest, size = None, 0
+    try:
+        r = http_client.get(url)
+        r.raise_for_status()
+        if len(r.content) > MAX_DOWNLOAD_BYTES:
+            raise ValueError("cover too large")
+        digest = hashlib.sha1(r.content).hexdigest()
+        size = _write_variants(r.content, digest)
+    except Exception:
+        digest, size = None, 0
+
+    now = time.time()
+    with _connection() as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO covers (url, digest, bytes, fetched_at, last_access)
+            VALUES (?, ?, ?, ?, ?)
+        """, (url, digest, size, now, now))
+        evicted = _evict(conn) if digest else []
+        conn.commit()
+    _remove_files(evicted)
+    return digest
+
+def local_sources(urls: Iterable[str], variant: str = "grid") -> Tuple[Dict[str, str], List[str]]:
+    """
+    Static URLs for the stored variant of each remote cover URL, plus the URLs
+    that still need downloading (see store). Covers not in the first dict should
+    be shown from their remote URL. Needs server.enableStaticServing.
+    """
+    urls = list(dict.fromkeys(u for u in urls if _storable(u)))
+    if not urls or not st.get_option("server.enableStaticServing"):
+        return {}, []
+
+    now = time.time()
+    with _connection() as conn:
+        marks = ",".join("?" * len(urls))
+        rows = conn.execute(
+            f"SELECT url, digest, fetched_at, last_access FROM covers WHERE url IN ({marks})", urls
+        ).fetchall()
+        stale = [url for url, digest, _, last_access in rows if digest and last_access < now - TOUCH_INTERVAL]
+        if stale:
+            conn.execute(f"UPDATE covers SET last_access=? WHERE url IN ({','.join('?' * len(stale))})",
+                         [now] + stale)
+            conn.commit()
+
+    known = {url: (digest, fetched_at) for url, digest, fetched_at, _ in rows}
+    sources, missing = {}, []
+    for url in urls:
+        digest, fetched_at = known.get(url, (None, 0.0))
+        if digest and os.path.exists(_variant_path(digest, variant)):
+            sources[url] = f"app/static/{_variant_name(digest, variant)}"
+        elif digest or fetched_at < now - FAILED_RETRY_SECONDS:
+            missing.append(url)
+    return sources, missing
+
+def local_path(url: str, variant: str = "detail") -> Optional[str]:
+    """Filesystem path of a stored cover variant, or None if the cover isn't stored."""
+    if not _storable(url):
+        return None
+    with _connection() as conn:
+        row = conn.execute("SELECT digest FROM covers WHERE url=?", (url,)).fetchone()
+    if row is None or row[0] is None:
+        return None
+    path = _variant_path(row[0], variant)
+    return path if os.path.exists(path) else None
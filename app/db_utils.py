@@ -1,24 +1,160 @@
 import sqlite3
+import numpy as np
 import pandas as pd
-import requests
 import re
-from difflib import SequenceMatcher
+import threading
+import time
+import queue
+from contextlib import contextmanager
 from urllib.parse import quote_plus
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from itertools import islice
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Iterator, List, Tuple
+from app import enrichment_cache, http_client, migrations, providers
 
 DB_PATH = "books_normalized.db"
+PLACEHOLDER_COVER = providers.PLACEHOLDER_COVER
+
+# Connection tuning
+POOL_SIZE = 8
+STATEMENT_CACHE_SIZE = 256
+SQLITE_CACHE_KIB = 32 * 1024
+SQLITE_MMAP_BYTES = 256 * 1024 * 1024
+BUSY_TIMEOUT_SECONDS = 30
+
+# Bookstacks paging
+BOOKS_PAGE_SIZE = 25
+# Matches offered by the Edit/Delete book pickers
+PICKER_LIMIT = 50
+PAGE_CACHE_SIZE = 64
+# Rows per chunk when streaming exports
+EXPORT_CHUNK_ROWS = 5000
+
+# Bulk cover rebuilds
+REBUILD_WORKERS = 8
+# Each lookup may hold providers.HEDGE_MAX_IN_FLIGHT connections; don't outgrow the HTTP pool
+REBUILD_MAX_WORKERS = max(1, http_client.POOL_MAXSIZE // providers.HEDGE_MAX_IN_FLIGHT)
+REBUILD_BATCH_SIZE = 25
+# Lookups queued per rebuild worker; an interrupted rebuild abandons at most this many each
+REBUILD_IN_FLIGHT = 2
+
+# Worst-case wall time for one uncached fetch_book_data, retries included
+ENRICHMENT_DEADLINE_SECONDS = 12
 
 # =====================
 # Database Helpers
 # =====================
 
-def get_connection():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+_pools: Dict[str, "queue.LifoQueue[sqlite3.Connection]"] = {}
+
+# Ids pulled out of DataFrames are numpy ints, which sqlite3 would store as 8-byte blobs
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.int32, int)
+
+def get_connection() -> sqlite3.Connection:
+    """Open a new connection in WAL mode with the tuned pragmas. Prefer connection()."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False,
+                           timeout=BUSY_TIMEOUT_SECONDS, cached_statements=STATEMENT_CACHE_SIZE)
+    # WAL lets dashboard readers keep reading while an admin edit is being written
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KIB}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    _ensure_migrated(conn)
+    return conn
+
+_migrated_paths = set()
+_migrate_lock = threading.Lock()
+
+def _ensure_migrated(conn: sqlite3.Connection):
+    """Bring the database schema up to date once per process, before first use."""
+    if DB_PATH in _migrated_paths:
+        return
+    with _migrate_lock:
+        if DB_PATH not in _migrated_paths:
+            migrations.apply_migrations(conn)
+            _migrated_paths.add(DB_PATH)
+
+@contextmanager
+def connection():
+    """
+    Borrow a pooled connection. Reused connections keep their page cache and
+    prepared statement cache. Uncommitted work is rolled back on the way out.
+    """
+    pool = _pools.setdefault(DB_PATH, queue.LifoQueue(maxsize=POOL_SIZE))
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = get_connection()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+# =====================
+# Library Snapshot
+# =====================
+
+_snapshot_lock = threading.Lock()
+_books_snapshot: Dict[str, Any] = {"version": None, "df": None}
+_write_version = 0
+_version_conn: Optional[sqlite3.Connection] = None
+
+def _mark_books_changed():
+    """Bump the in-process write counter after committing a change to the library."""
+    global _write_version
+    with _snapshot_lock:
+        _write_version += 1
+
+@contextmanager
+def books_transaction():
+    """
+    Borrow a pooled connection for a write to the library. Commits and
+    invalidates the cached snapshot and pages on success; rolls back on error.
+    """
+    with connection() as conn:
+        yield conn
+        conn.commit()
+    _mark_books_changed()
+
+def data_version() -> tuple:
+    """
+    Token that changes whenever the library data changes. Combines the write
+    counter with PRAGMA data_version on a dedicated connection, which moves on
+    every commit made through any other connection or process.
+    """
+    global _version_conn
+    with _snapshot_lock:
+        if _version_conn is None:
+            _version_conn = get_connection()
+        sqlite_version = _version_conn.execute("PRAGMA data_version").fetchone()[0]
+        return (DB_PATH, _write_version, sqlite_version)
 
 def get_books() -> pd.DataFrame:
-    """Return books with author, genre, and average rating."""
-    conn = get_connection()
-    query = """
+    """
+    Return books with author, genre, and average rating.
+    The frame is one snapshot shared by every session in the process and is
+    only rebuilt when data_version() changes. Treat it as read-only and
+    .copy() before modifying.
+    """
+    version = data_version()
+    with _snapshot_lock:
+        if _books_snapshot["version"] == version:
+            return _books_snapshot["df"]
+    df = _load_books()
+    with _snapshot_lock:
+        _books_snapshot["version"] = version
+        _books_snapshot["df"] = df
+    return df
+
+_BOOKS_SELECT = """
     SELECT
         b.id,
         b.title,
@@ -28,17 +164,166 @@ def get_books() -> pd.DataFrame:
         b.isbn,
         b.subjects,
         b.cover_url,
-        ROUND(AVG(r.rating), 2) AS rating
+        ROUND(s.rating_mean, 2) AS rating
     FROM books b
     LEFT JOIN authors a ON b.author_id = a.id
     LEFT JOIN genres g ON b.genre_id = g.id
-    LEFT JOIN ratings r ON b.id = r.book_id
-    GROUP BY b.id
-    ORDER BY b.year DESC, b.title;
+    LEFT JOIN book_rating_stats s ON b.id = s.book_id
+"""
+
+def _load_books() -> pd.DataFrame:
+    query = _BOOKS_SELECT + "ORDER BY b.year DESC, b.title;"
+    with connection() as conn:
+        return pd.read_sql(query, conn)
+
+# =====================
+# Search
+# =====================
+
+def _fts_query(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 query where every word must match as a prefix."""
+    tokens = re.findall(r"\w+", (text or "").lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+def search_books(text: str, limit: Optional[int] = None) -> List[int]:
+    """Book ids matching text across title, author and subjects, best match first."""
+    match = _fts_query(text)
+    if match is None:
+        return []
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT rowid FROM books_fts WHERE books_fts MATCH ? ORDER BY rank LIMIT ?",
+            (match, -1 if limit is None else int(limit)),
+        ).fetchall()
+    return [r[0] for r in rows]
+
+def find_books(text: str, limit: int = PICKER_LIMIT) -> pd.DataFrame:
     """
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
+    Top matches (id, title, author, year) for a title/author prefix search, for
+    the maintenance pickers. With no text, the most recently added books.
+    """
+    match = _fts_query(text)
+    with connection() as conn:
+        if match is None:
+            return pd.read_sql("""
+                SELECT b.id, b.title, a.name AS author, b.year
+                FROM books b LEFT JOIN authors a ON b.author_id = a.id
+                ORDER BY b.id DESC LIMIT ?
+            """, conn, params=(int(limit),))
+        return pd.read_sql("""
+            SELECT b.id, b.title, a.name AS author, b.year
+            FROM (SELECT rowid, rank FROM books_fts WHERE books_fts MATCH ? ORDER BY rank LIMIT ?) f
+            JOIN books b ON b.id = f.rowid
+            LEFT JOIN authors a ON b.author_id = a.id
+            ORDER BY f.rank
+        """, conn, params=(f"{{title author}} : ({match})", int(limit)))
+
+def get_book(book_id: int) -> Optional[pd.Series]:
+    """One book with author, genre and average rating, or None if it no longer exists."""
+    with connection() as conn:
+        row = pd.read_sql(_BOOKS_SELECT + "WHERE b.id = ?", conn, params=(int(book_id),))
+    return None if row.empty else row.iloc[0]
+
+# =====================
+# Paged Browsing
+# =====================
+
+_page_cache: "OrderedDict[tuple, Tuple[pd.DataFrame, Optional[tuple]]]" = OrderedDict()
+_page_cache_lock = threading.Lock()
+_prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-prefetch")
+
+def _filter_clauses(filters: Optional[Dict[str, Any]]) -> Tuple[List[str], List[Any]]:
+    """SQL predicates for the Bookstacks filters: search text, genre name and year."""
+    filters = filters or {}
+    where, params = [], []
+    match = _fts_query(filters.get("search") or "")
+    if match:
+        where.append("b.id IN (SELECT rowid FROM books_fts WHERE books_fts MATCH ?)")
+        params.append(match)
+    if filters.get("genre") and filters["genre"] != "All":
+        where.append("b.genre_id = (SELECT id FROM genres WHERE name = ?)")
+        params.append(filters["genre"])
+    if filters.get("year") and filters["year"] != "All":
+        where.append("b.year = ?")
+        params.append(int(filters["year"]))
+    return where, params
+
+def get_filter_options() -> Dict[str, List[Any]]:
+    """Distinct genres and years that have books, for the Bookstacks filter widgets."""
+    with connection() as conn:
+        genres = [r[0] for r in conn.execute(
+            "SELECT name FROM genres WHERE id IN (SELECT DISTINCT genre_id FROM books) ORDER BY name")]
+        years = [r[0] for r in conn.execute(
+            "SELECT DISTINCT year FROM books WHERE year IS NOT NULL ORDER BY year")]
+    return {"genres": genres, "years": years}
+
+def get_books_page(filters: Optional[Dict[str, Any]] = None, cursor: Optional[tuple] = None,
+                   limit: Optional[int] = BOOKS_PAGE_SIZE) -> Tuple[pd.DataFrame, Optional[tuple]]:
+    """
+    One page of books matching filters, in get_books() order (year DESC, title).
+    cursor is the value returned with the previous page (None for the first);
+    the returned cursor is None once there are no more rows. limit=None returns
+    every match. Pages are cached until data_version() changes.
+    """
+    key = (data_version(), tuple(sorted((filters or {}).items())), cursor, limit)
+    with _page_cache_lock:
+        if key in _page_cache:
+            _page_cache.move_to_end(key)
+            return _page_cache[key]
+
+    where, params = _filter_clauses(filters)
+    if cursor is not None:
+        # Keyset on the sort key; NULL years sort last, as in get_books()
+        year_key, title, book_id = cursor
+        where.append("(COALESCE(b.year, -1) < ? OR (COALESCE(b.year, -1) = ? AND (b.title, b.id) > (?, ?)))")
+        params.extend([year_key, year_key, title, book_id])
+    query = _BOOKS_SELECT
+    if where:
+        query += "WHERE " + " AND ".join(where) + "\n"
+    query += "ORDER BY COALESCE(b.year, -1) DESC, b.title, b.id"
+    if limit is not None:
+        # One extra row tells us whether another page exists
+        query += " LIMIT ?"
+        params.append(int(limit) + 1)
+
+    with connection() as conn:
+        df = pd.read_sql(query, conn, params=params)
+
+    next_cursor = None
+    if limit is not None and len(df) > limit:
+        df = df.iloc[:limit]
+        last = df.iloc[-1]
+        next_cursor = (int(last["year"]) if pd.notna(last["year"]) else -1, last["title"], int(last["id"]))
+
+    with _page_cache_lock:
+        _page_cache[key] = (df, next_cursor)
+        while len(_page_cache) > PAGE_CACHE_SIZE:
+            _page_cache.popitem(last=False)
+    return df, next_cursor
+
+def iter_books(filters: Optional[Dict[str, Any]] = None,
+               chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Every book matching filters, in get_books_page() order, as DataFrames of at
+    most chunk_size (default EXPORT_CHUNK_ROWS) rows, read straight from the
+    cursor rather than cached.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_ROWS
+    where, params = _filter_clauses(filters)
+    query = _BOOKS_SELECT
+    if where:
+        query += "WHERE " + " AND ".join(where) + "\n"
+    query += "ORDER BY COALESCE(b.year, -1) DESC, b.title, b.id"
+    with connection() as conn:
+        yield from pd.read_sql(query, conn, params=params, chunksize=chunk_size)
+
+def prefetch_books_page(filters: Optional[Dict[str, Any]], cursor: Optional[tuple],
+                        limit: Optional[int] = BOOKS_PAGE_SIZE):
+    """Warm the page cache for the next page in the background."""
+    if cursor is not None:
+        _prefetch_pool.submit(get_books_page, filters, cursor, limit)
 
 def _get_or_create_author(conn: sqlite3.Connection, name: str) -> int:
     c = conn.cursor()
@@ -60,36 +345,46 @@ def _get_or_create_genre(conn: sqlite3.Connection, name: str) -> int:
     conn.commit()
     return c.lastrowid
 
+def _enqueue_enrichment(conn: sqlite3.Connection, book_id: int):
+    """Queue a background metadata lookup for a book (one job per book) in the caller's transaction."""
+    now = time.time()
+    conn.execute("""
+        INSERT INTO enrichment_jobs (book_id, status, attempts, next_attempt_at, last_error, updated_at)
+        VALUES (?, 'pending', 0, ?, NULL, ?)
+        ON CONFLICT(book_id) DO UPDATE SET
+            status = 'pending', attempts = 0, next_attempt_at = excluded.next_attempt_at,
+            last_error = NULL, updated_at = excluded.updated_at
+    """, (book_id, now, now))
+
 def add_book(title: str, author: str, genre: str, year: int,
              rating: float, isbn: Optional[str] = None,
-             subjects: Optional[str] = None, cover_url: Optional[str] = None):
-    """Insert new book + rating. If cover/subjects missing, try to fetch."""
-    conn = get_connection()
-    c = conn.cursor()
-
-    author_id = _get_or_create_author(conn, author or "Unknown")
+             subjects: Optional[str] = None, cover_url: Optional[str] = None) -> int:
+    """
+    Insert new book + rating and return its id. Missing cover, ISBN or
+    subjects are filled in later by app/enrichment_queue.py.
+    """
+    with connection() as conn:
+        c = conn.cursor()
 
-    if not subjects and not cover_url:
-        fetched = fetch_book_data(title, author, isbn if isbn else None)
-        cover_url = cover_url or fetched.get("cover_url")
-        subjects = subjects or fetched.get("subjects")
-        if fetched.get("isbn"):
-            isbn = fetched["isbn"]
+        author_id = _get_or_create_author(conn, author or "Unknown")
 
-    genre_name = genre or (subjects.split(",")[0] if subjects else "Unknown")
-    genre_id = _get_or_create_genre(conn, genre_name)
+        genre_name = genre or (subjects.split(",")[0] if subjects else "Unknown")
+        genre_id = _get_or_create_genre(conn, genre_name)
 
-    c.execute("""
-        INSERT INTO books (title, author_id, genre_id, year, isbn, subjects, cover_url)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (title, author_id, genre_id, year, isbn, subjects, cover_url))
-    book_id = c.lastrowid
+        c.execute("""
+            INSERT INTO books (title, author_id, genre_id, year, isbn, subjects, cover_url)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (title, author_id, genre_id, year, isbn, subjects, cover_url))
+        book_id = c.lastrowid
 
-    if rating is not None:
-        c.execute("INSERT INTO ratings (book_id, rating) VALUES (?, ?)", (book_id, float(rating)))
+        if rating is not None:
+            c.execute("INSERT INTO ratings (book_id, rating) VALUES (?, ?)", (book_id, float(rating)))
 
-    conn.commit()
-    conn.close()
+        if not (cover_url and subjects and isbn):
+            _enqueue_enrichment(conn, book_id)
+        conn.commit()
+    _mark_books_changed()
+    return book_id
 
 def update_book(book_id: int, title: str, author: str, genre: str, year: int,
                 rating: float, isbn: Optional[str] = None,
@@ -98,8 +393,7 @@ def update_book(book_id: int, title: str, author: str, genre: str, year: int,
     Update an existing book with edited values from the form.
     Overwrites all editable fields and replaces rating.
     """
-    conn = get_connection()
-    try:
+    with connection() as conn:
         c = conn.cursor()
 
         # Resolve author and genre IDs (create if missing)
@@ -119,20 +413,19 @@ def update_book(book_id: int, title: str, author: str, genre: str, year: int,
         if rating is not None:
             c.execute("INSERT INTO ratings (book_id, rating) VALUES (?, ?)", (book_id, float(rating)))
 
+        # Cleared fields are looked up again in the background
+        if not (cover_url and subjects and isbn):
+            _enqueue_enrichment(conn, book_id)
         conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+    _mark_books_changed()
 
 def delete_book(book_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM ratings WHERE book_id=?", (book_id,))
-    c.execute("DELETE FROM books WHERE id=?", (book_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM ratings WHERE book_id=?", (book_id,))
+        c.execute("DELETE FROM books WHERE id=?", (book_id,))
+        conn.commit()
+    _mark_books_changed()
 
 # =====================
 # Open Library link
@@ -148,85 +441,34 @@ def openlibrary_link(title: str, author: str, isbn: Optional[str]) -> str:
 # Cover Fetching
 # =====================
 
-def _normalize_text(s: str) -> str:
-    s = s or ""
-    s = s.strip().lower()
-    s = re.sub(r"[’'`]", "'", s)
-    s = re.sub(r"[^a-z0-9\s:,-]", " ", s)
-    s = re.sub(r"\s+", " ", s)
-    return s
-
-def _title_similarity(a: str, b: str) -> float:
-    return SequenceMatcher(None, _normalize_text(a), _normalize_text(b)).ratio()
-
-def fetch_cover_by_isbn(isbn: str) -> Optional[str]:
-    if not isbn:
-        return None
-    try:
-        r = requests.get(f"https://openlibrary.org/isbn/{isbn}.json", timeout=10)
-        if r.status_code == 200:
-            js = r.json()
-            if isinstance(js, dict) and "covers" in js and js["covers"]:
-                cover_id = js["covers"][0]
-                return f"https://covers.openlibrary.org/b/id/{cover_id}-L.jpg"
-    except Exception:
-        pass
-    return f"https://covers.openlibrary.org/b/isbn/{isbn}-L.jpg"
-
-def fetch_openlibrary_best(title: str, author: Optional[str]) -> Dict[str, Optional[str]]:
-    attempts = []
-    if author:
-        attempts.append({"title": title, "author": author})
-    attempts.append({"title": title})
-    attempts.append({"q": f"{title} {author or ''}".strip()})
-
-    for params in attempts:
-        try:
-            r = requests.get("https://openlibrary.org/search.json", params=params, timeout=10)
-            if r.status_code != 200:
-                continue
-            docs = (r.json() or {}).get("docs", []) or []
-            if not docs:
-                continue
-            best = docs[0]
-            cover_url = f"https://covers.openlibrary.org/b/id/{best['cover_i']}-L.jpg" if "cover_i" in best else None
-            isbn = (best.get("isbn") or [None])[0]
-            subjects = ", ".join((best.get("subject") or [])[:5]) if best.get("subject") else None
-            return {"cover_url": cover_url, "isbn": isbn, "subjects": subjects}
-        except Exception:
-            continue
-    return {"cover_url": None, "isbn": None, "subjects": None}
-
-def fetch_cover_google_books(title: str, author: Optional[str]) -> Optional[str]:
-    q = f'intitle:"{title}"'
-    if author:
-        q += f'+inauthor:"{author}"'
-    try:
-        r = requests.get("https://www.googleapis.com/books/v1/volumes",
-                         params={"q": q, "maxResults": 5}, timeout=10)
-        items = (r.json() or {}).get("items", [])
-        for it in items:
-            links = (it.get("volumeInfo") or {}).get("imageLinks") or {}
-            for key in ["extraLarge", "large", "medium", "small", "thumbnail"]:
-                if links.get(key):
-                    return links[key]
-    except Exception:
-        pass
-    return None
+def _enrichment_cache_key(title: str, author: Optional[str], isbn: Optional[str]) -> str:
+    # Only a well-formed ISBN identifies a book; anything else (e.g. 'nan') falls back to title + author
+    canonical = providers.canonical_isbn(isbn)
+    if canonical:
+        return f"isbn:{canonical}"
+    return f"ta:{providers.normalize_text(title)}|{providers.normalize_text(author or '')}"
 
 def fetch_book_data(title: str, author: Optional[str], isbn: Optional[str]) -> Dict[str, Optional[str]]:
-    if isbn and str(isbn).strip():
-        cover_isbn = fetch_cover_by_isbn(str(isbn).strip())
-        if cover_isbn:
-            return {"cover_url": cover_isbn, "isbn": isbn, "subjects": None}
-    ol = fetch_openlibrary_best(title, author)
-    if ol.get("cover_url"):
-        return ol
-    gb = fetch_cover_google_books(title, author)
-    if gb:
-        return {"cover_url": gb, "isbn": isbn, "subjects": None}
-    return {"cover_url": "https://via.placeholder.com/256x384.png?text=No+Cover",
-            "isbn": isbn, "subjects": None}
+    """
+    Cached front for providers.lookup; misses are cached too, with a shorter TTL.
+    Uncached lookups take at most ENRICHMENT_DEADLINE_SECONDS across all providers.
+    Raises providers.ProvidersUnavailable, and caches nothing, when the miss
+    came from providers that errored or timed out rather than answered.
+    """
+    key = _enrichment_cache_key(title, author, isbn)
+    cached = enrichment_cache.get(key)
+    if cached is not None:
+        return cached
+    start = time.perf_counter()
+    with http_client.deadline(ENRICHMENT_DEADLINE_SECONDS):
+        result = providers.lookup(title, author, isbn)
+        # A lookup cut short by the deadline says nothing about the book; don't cache it
+        if http_client.expired():
+            return result
+    enrichment_cache.put(key, result,
+                         found=result.get("cover_url") != PLACEHOLDER_COVER,
+                         fetch_seconds=time.perf_counter() - start)
+    return result
 
 def get_or_fetch_cover_for_row(row: pd.Series) -> str:
     current = (row.get("cover_url") or "").strip()
@@ -235,32 +477,135 @@ def get_or_fetch_cover_for_row(row: pd.Series) -> str:
     fetched = fetch_book_data(row.get("title") or "", row.get("author"), row.get("isbn"))
     cover_url = (fetched.get("cover_url") or "").strip()
     if cover_url:
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("UPDATE books SET cover_url=?, isbn=?, subjects=? WHERE id=?",
-                  (cover_url, fetched.get("isbn") or row.get("isbn"),
-                   fetched.get("subjects") or row.get("subjects"), int(row["id"])))
-        conn.commit()
-        conn.close()
+        with connection() as conn:
+            conn.execute("UPDATE books SET cover_url=?, isbn=?, subjects=? WHERE id=?",
+                         (cover_url, fetched.get("isbn") or row.get("isbn"),
+                          fetched.get("subjects") or row.get("subjects"), int(row["id"])))
+            conn.commit()
+        _mark_books_changed()
         return cover_url
-    return "https://via.placeholder.com/256x384.png?text=No+Cover"
-
-def rebuild_covers() -> int:
-    """Refetch covers/subjects for every book using title/author/isbn."""
-    conn = get_connection()
-    df = pd.read_sql("""
-        SELECT b.id, b.title, b.isbn, a.name AS author
-        FROM books b LEFT JOIN authors a ON b.author_id = a.id
-    """, conn)
-    updated = 0
-    c = conn.cursor()
-    for _, r in df.iterrows():
-        fetched = fetch_book_data(r["title"], r["author"], r["isbn"])
-        cover_url = (fetched.get("cover_url") or "").strip()
-        if cover_url:
-            c.execute("UPDATE books SET cover_url=?, isbn=?, subjects=? WHERE id=?",
-                      (cover_url, fetched.get("isbn") or r["isbn"], fetched.get("subjects"), int(r["id"])))
-            updated += 1
-    conn.commit()
-    conn.close()
+    return PLACEHOLDER_COVER
+
+def apply_enrichment(book_id: int, fetched: Dict[str, Optional[str]]):
+    """
+    Fill a book's empty cover, ISBN and subjects from a lookup result without
+    touching values the user entered. A book filed under 'Unknown' takes its
+    genre from the first subject, as add_book used to do.
+    """
+    subjects = fetched.get("subjects")
+    with connection() as conn:
+        conn.execute("""
+            UPDATE books SET
+                cover_url = COALESCE(NULLIF(cover_url, ''), ?),
+                isbn = COALESCE(NULLIF(isbn, ''), ?),
+                subjects = COALESCE(NULLIF(subjects, ''), ?)
+            WHERE id = ?
+        """, (fetched.get("cover_url"), fetched.get("isbn"), subjects, book_id))
+        if subjects:
+            conn.execute("""
+                UPDATE books SET genre_id = ?
+                WHERE id = ? AND genre_id IN (SELECT id FROM genres WHERE name = 'Unknown')
+            """, (_get_or_create_genre(conn, subjects.split(",")[0].strip()), book_id))
+        conn.commit()
+    _mark_books_changed()
+
+def rebuild_covers(max_workers: int = REBUILD_WORKERS, batch_size: int = REBUILD_BATCH_SIZE,
+                   progress: Optional[Callable[[int, int, int], None]] = None,
+                   resume: bool = True, only_missing: bool = False) -> int:
+    """
+    Refetch covers/subjects for every book using title/author/isbn.
+    Lookups run on a bounded thread pool with at most REBUILD_IN_FLIGHT per
+    worker submitted at a time, and results are committed every batch_size
+    books along with a checkpoint. If the run is interrupted (including by an
+    exception from progress), queued lookups are cancelled and finished ones
+    are checkpointed, so a resumed run picks up the books it had not reached.
+    progress(done, total, updated) is called after each book. only_missing
+    limits the run to books without a cover, e.g. right after a bulk import.
+    """
+    max_workers = min(max(1, max_workers), REBUILD_MAX_WORKERS)
+    with connection() as conn:
+        if not resume:
+            conn.execute("DELETE FROM rebuild_checkpoint")
+            conn.commit()
+        df = pd.read_sql("""
+            SELECT b.id, b.title, b.isbn, a.name AS author
+            FROM books b LEFT JOIN authors a ON b.author_id = a.id
+            WHERE b.id NOT IN (SELECT book_id FROM rebuild_checkpoint)
+        """ + (" AND (b.cover_url IS NULL OR b.cover_url = '')" if only_missing else ""), conn)
+        done, updated = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(updated), 0) FROM rebuild_checkpoint"
+        ).fetchone()
+        total = done + len(df)
+
+        pending_updates, pending_checkpoints = [], []
+
+        def flush():
+            conn.executemany("UPDATE books SET cover_url=?, isbn=?, subjects=? WHERE id=?", pending_updates)
+            conn.executemany("INSERT OR REPLACE INTO rebuild_checkpoint (book_id, updated) VALUES (?, ?)",
+                             pending_checkpoints)
+            conn.commit()
+            if pending_updates:
+                _mark_books_changed()
+            pending_updates.clear()
+            pending_checkpoints.clear()
+
+        # Empty columns come through pandas as NaN; the fetchers expect None
+        rows = ({k: (None if pd.isna(v) else v) for k, v in r.items()} for r in df.to_dict("records"))
+        in_flight: Dict[Future, Dict[str, Any]] = {}
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+
+        def submit(count: int):
+            for r in islice(rows, count):
+                in_flight[pool.submit(fetch_book_data, r["title"], r["author"], r["isbn"])] = r
+
+        try:
+            submit(max_workers * REBUILD_IN_FLIGHT)
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    r = in_flight.pop(future)
+                    submit(1)
+                    done += 1
+                    try:
+                        fetched = future.result()
+                    except Exception:
+                        # Left out of the checkpoint so a resumed run retries it
+                        fetched = None
+                    if fetched is not None:
+                        cover_url = (fetched.get("cover_url") or "").strip()
+                        if cover_url:
+                            pending_updates.append((cover_url, fetched.get("isbn") or r["isbn"],
+                                                    fetched.get("subjects"), int(r["id"])))
+                            updated += 1
+                        pending_checkpoints.append((int(r["id"]), int(bool(cover_url))))
+                    if len(pending_checkpoints) >= batch_size:
+                        flush()
+                    if progress:
+                        progress(done, total, updated)
+        except BaseException:
+            # Keep what already finished before handing the interruption on
+            try:
+                flush()
+            except Exception:
+                conn.rollback()
+            raise
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        flush()
+        conn.execute("DELETE FROM rebuild_checkpoint")
+        conn.commit()
     return updated
+
+if __name__ == "__main__":
+    import sys
+
+    def _print_progress(done: int, total: int, updated: int):
+        sys.stdout.write(f"\rRebuilding covers: {done}/{total} ({updated} updated)")
+        sys.stdout.flush()
+
+    if sys.argv[1:] == ["rebuild-covers"]:
+        rebuild_covers(progress=_print_progress)
+        print()
+    else:
+        print("usage: python -m app.db_utils rebuild-covers")
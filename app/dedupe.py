@@ -0,0 +1,181 @@
+import re
+import zlib
+from typing import Optional, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from app import db_utils, providers
+
+# 64 hash functions split into 16 bands of 4: pairs with Jaccard similarity
+# around 0.5 or more almost always share a band; then the signatures decide.
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.7
+# Buckets this crowded hold generic titles, not duplicates; skipping them keeps reports linear
+MAX_BUCKET_SIZE = 50
+INDEX_BATCH_SIZE = 1000
+
+_MERSENNE = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _MERSENNE, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _MERSENNE, size=NUM_PERM, dtype=np.uint64)
+
+# =====================
+# MinHash Signatures
+# =====================
+# Shingles are character 3-grams of the normalized title and author, hashed
+# with crc32 so signatures stored in the database stay valid across runs.
+
+def _shingle_hashes(title: str, author: Optional[str]) -> List[int]:
+    hashes = set()
+    for prefix, text in (("t", providers.normalize_text(title)), ("a", providers.normalize_text(author or ""))):
+        grams = [text[i:i + SHINGLE_SIZE] for i in range(max(len(text) - SHINGLE_SIZE + 1, 1))]
+        hashes.update(zlib.crc32(f"{prefix}:{g}".encode()) for g in grams)
+    return list(hashes)
+
+def signatures(books: List[Tuple[str, Optional[str]]]) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint32 values) for each (title, author), as one vectorized pass."""
+    shingles = [_shingle_hashes(title, author) for title, author in books]
+    if not shingles:
+        return np.empty((0, NUM_PERM), dtype=np.uint32)
+    lengths = np.fromiter((len(s) for s in shingles), dtype=np.int64, count=len(shingles))
+    flat = np.fromiter((h for s in shingles for h in s), dtype=np.uint64, count=int(lengths.sum())) % _MERSENNE
+    hashed = (_A[:, None] * flat[None, :] + _B[:, None]) % _MERSENNE
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.minimum.reduceat(hashed, starts, axis=1).T.astype(np.uint32)
+
+def _band_buckets(signature: np.ndarray) -> List[Tuple[int, int]]:
+    bands = signature.reshape(BANDS, ROWS_PER_BAND)
+    return [(band, zlib.crc32(bands[band].tobytes())) for band in range(BANDS)]
+
+def _numbers(title) -> frozenset:
+    """Digit runs in a title; volume and edition numbers that 3-grams can't tell apart."""
+    return frozenset(re.findall(r"\d+", str(title or "")))
+
+def _similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity: the share of matching MinHash values (row-wise for 2-D input)."""
+    return (a == b).mean(axis=-1)
+
+# =====================
+# Index Maintenance
+# =====================
+
+def ensure_index() -> int:
+    """Sign every book that isn't in the index yet (new, imported or edited). Returns how many."""
+    with db_utils.connection() as conn:
+        rows = conn.execute("""
+            SELECT b.id, b.title, a.name
+            FROM books b
+            LEFT JOIN authors a ON b.author_id = a.id
+            WHERE NOT EXISTS (SELECT 1 FROM book_minhash m WHERE m.book_id = b.id)
+        """).fetchall()
+        for start in range(0, len(rows), INDEX_BATCH_SIZE):
+            batch = rows[start:start + INDEX_BATCH_SIZE]
+            sigs = signatures([(title or "", author) for _, title, author in batch])
+            conn.executemany("INSERT OR REPLACE INTO book_minhash (book_id, signature) VALUES (?, ?)",
+                             [(book_id, sig.tobytes()) for (book_id, _, _), sig in zip(batch, sigs)])
+            conn.executemany("INSERT OR IGNORE INTO book_lsh (band, bucket, book_id) VALUES (?, ?, ?)",
+                             [(band, bucket, book_id)
+                              for (book_id, _, _), sig in zip(batch, sigs)
+                              for band, bucket in _band_buckets(sig)])
+            conn.commit()
+    return len(rows)
+
+def _load_signatures(conn, book_ids: List[int]) -> Dict[int, np.ndarray]:
+    found = {}
+    for start in range(0, len(book_ids), 900):
+        chunk = book_ids[start:start + 900]
+        found.update(
+            (book_id, np.frombuffer(blob, dtype=np.uint32))
+            for book_id, blob in conn.execute(
+                f"SELECT book_id, signature FROM book_minhash WHERE book_id IN ({','.join('?' * len(chunk))})", chunk)
+        )
+    return found
+
+def _book_details(conn, book_ids: List[int]) -> pd.DataFrame:
+    if not book_ids:
+        return pd.DataFrame(columns=["id", "title", "author", "year"])
+    marks = ",".join("?" * len(book_ids))
+    return pd.read_sql(f"""
+        SELECT b.id, b.title, a.name AS author, b.year
+        FROM books b LEFT JOIN authors a ON b.author_id = a.id
+        WHERE b.id IN ({marks})
+    """, conn, params=book_ids)
+
+# =====================
+# Duplicate Checks
+# =====================
+
+def find_duplicates(title: str, author: Optional[str], exclude_id: Optional[int] = None,
+                    threshold: float = DUPLICATE_THRESHOLD) -> pd.DataFrame:
+    """
+    Books that look like the same title and author, most similar first. Only
+    books sharing an LSH bucket are compared, so the cost doesn't grow with the library.
+    """
+    ensure_index()
+    signature = signatures([(title, author)])[0]
+    buckets = _band_buckets(signature)
+    with db_utils.connection() as conn:
+        where = " OR ".join(["(band = ? AND bucket = ?)"] * len(buckets))
+        candidates = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT book_id FROM book_lsh WHERE {where}",
+            [value for pair in buckets for value in pair])
+            if row[0] != exclude_id]
+        stored = _load_signatures(conn, candidates)
+        scores = {book_id: float(_similarity(sig, signature)) for book_id, sig in stored.items()}
+        matches = [book_id for book_id, score in scores.items() if score >= threshold]
+        details = _book_details(conn, matches)
+    details = details[details["title"].map(_numbers) == _numbers(title)].copy()
+    details["similarity"] = details["id"].map(scores)
+    return details.sort_values("similarity", ascending=False).reset_index(drop=True)
+
+def duplicate_report(threshold: float = DUPLICATE_THRESHOLD) -> pd.DataFrame:
+    """
+    Every pair of likely duplicates in the library, most similar first, with a
+    group id linking books that are duplicates of each other. Candidate pairs
+    come from shared LSH buckets, so the work is roughly linear in library size.
+    """
+    ensure_index()
+    with db_utils.connection() as conn:
+        pairs = np.array(conn.execute("""
+            WITH shared AS (
+                SELECT band, bucket FROM book_lsh
+                GROUP BY band, bucket
+                HAVING COUNT(*) BETWEEN 2 AND ?
+            )
+            SELECT DISTINCT l1.book_id, l2.book_id
+            FROM shared s
+            JOIN book_lsh l1 ON l1.band = s.band AND l1.bucket = s.bucket
+            JOIN book_lsh l2 ON l2.band = s.band AND l2.bucket = s.bucket AND l2.book_id > l1.book_id
+        """, (MAX_BUCKET_SIZE,)).fetchall(), dtype=np.int64).reshape(-1, 2)
+        ids = np.unique(pairs)
+        stored = _load_signatures(conn, ids.tolist())
+        matrix = np.stack([stored[i] for i in ids.tolist()]) if len(ids) else np.empty((0, NUM_PERM), np.uint32)
+        left, right = np.searchsorted(ids, pairs[:, 0]), np.searchsorted(ids, pairs[:, 1])
+        scores = _similarity(matrix[left], matrix[right]) if len(pairs) else np.empty(0)
+        keep = scores >= threshold
+        pairs, scores = pairs[keep], scores[keep]
+        details = _book_details(conn, np.unique(pairs).tolist()).set_index("id")
+    numbers = details["title"].map(_numbers)
+    same_numbers = np.array([numbers[a] == numbers[b] for a, b in pairs.tolist()], dtype=bool)
+    pairs, scores = pairs[same_numbers].reshape(-1, 2), scores[same_numbers]
+
+    # Union-find over the kept pairs so chains of near-duplicates share a group
+    parent = {int(i): int(i) for i in np.unique(pairs)}
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in pairs.tolist():
+        parent[root(a)] = root(b)
+
+    report = pd.DataFrame({"book_id": pairs[:, 0], "duplicate_id": pairs[:, 1], "similarity": scores})
+    report["group"] = [root(int(a)) for a in report["book_id"]]
+    for prefix, column in (("", "book_id"), ("duplicate_", "duplicate_id")):
+        report[f"{prefix}title"] = report[column].map(details["title"])
+        report[f"{prefix}author"] = report[column].map(details["author"])
+    return report.sort_values(["similarity", "group"], ascending=[False, True]).reset_index(drop=True)
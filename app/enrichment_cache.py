@@ -0,0 +1,134 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+
+CACHE_DB_PATH = "enrichment_cache.db"
+
+# Found results change rarely; misses are retried sooner in case a provider catches up.
+DEFAULT_TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+MAX_ENTRIES = 5000
+# last_access is only rewritten when older than this, so most hits are read-only
+TOUCH_INTERVAL = 3600
+
+_lock = threading.Lock()
+_db_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_conn_path: Optional[str] = None
+_stats = {"hits": 0, "negative_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "saved_seconds": 0.0}
+
+# =====================
+# Storage
+# =====================
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS enrichment_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            found INTEGER NOT NULL,
+            fetch_seconds REAL NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_enrichment_cache_last_access ON enrichment_cache(last_access)")
+    conn.commit()
+    return conn
+
+@contextmanager
+def _connection():
+    """The process-wide cache connection, opened (and the schema created) once per CACHE_DB_PATH."""
+    global _conn, _conn_path
+    with _db_lock:
+        if _conn is None or _conn_path != CACHE_DB_PATH:
+            if _conn is not None:
+                _conn.close()
+            _conn = _connect()
+            _conn_path = CACHE_DB_PATH
+        try:
+            yield _conn
+        finally:
+            if _conn.in_transaction:
+                _conn.rollback()
+
+def _bump(name: str, amount: float = 1):
+    with _lock:
+        _stats[name] += amount
+
+# =====================
+# Public API
+# =====================
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    """Return the cached value for key, or None on a miss or expired entry."""
+    now = time.time()
+    with _connection() as conn:
+        row = conn.execute(
+            "SELECT value, found, fetch_seconds, expires_at, last_access FROM enrichment_cache WHERE key=?", (key,)
+        ).fetchone()
+        if row is None or row[3] <= now:
+            _bump("misses")
+            return None
+        if row[4] < now - TOUCH_INTERVAL:
+            conn.execute("UPDATE enrichment_cache SET last_access=? WHERE key=?", (now, key))
+            conn.commit()
+
+    value, found, fetch_seconds, _, _ = row
+    _bump("hits" if found else "negative_hits")
+    _bump("saved_seconds", fetch_seconds or 0.0)
+    return json.loads(value)
+
+def put(key: str, value: Dict[str, Any], found: bool = True,
+        fetch_seconds: float = 0.0, ttl: Optional[float] = None):
+    """Store a lookup result. Not-found results get the shorter NEGATIVE_TTL by default."""
+    now = time.time()
+    if ttl is None:
+        ttl = DEFAULT_TTL if found else NEGATIVE_TTL
+    with _connection() as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO enrichment_cache
+                (key, value, found, fetch_seconds, created_at, expires_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (key, json.dumps(value), int(bool(found)), float(fetch_seconds), now, now + ttl, now))
+        _evict(conn, now)
+        conn.commit()
+    _bump("stores")
+
+def _evict(conn: sqlite3.Connection, now: float):
+    """Drop expired entries, then the least recently used ones above MAX_ENTRIES."""
+    removed = conn.execute("DELETE FROM enrichment_cache WHERE expires_at <= ?", (now,)).rowcount
+    removed += conn.execute("""
+        DELETE FROM enrichment_cache WHERE key IN (
+            SELECT key FROM enrichment_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+        )
+    """, (MAX_ENTRIES,)).rowcount
+    if removed:
+        _bump("evictions", removed)
+
+def invalidate(key: str):
+    with _connection() as conn:
+        conn.execute("DELETE FROM enrichment_cache WHERE key=?", (key,))
+        conn.commit()
+
+def clear():
+    with _connection() as conn:
+        conn.execute("DELETE FROM enrichment_cache")
+        conn.commit()
+
+def stats() -> Dict[str, Any]:
+    """Hit/miss counters for this process plus the current number of stored entries."""
+    with _lock:
+        snapshot = dict(_stats)
+    with _connection() as conn:
+        snapshot["entries"] = conn.execute("SELECT COUNT(*) FROM enrichment_cache").fetchone()[0]
+    lookups = snapshot["hits"] + snapshot["negative_hits"] + snapshot["misses"]
+    snapshot["hit_rate"] = (snapshot["hits"] + snapshot["negative_hits"]) / lookups if lookups else 0.0
+    return snapshot
@@ -0,0 +1,164 @@
+import threading
+import time
+from typing import Optional, Dict, Tuple
+from app import db_utils, providers
+
+# Jobs live in the enrichment_jobs table (migration 6), so a restart picks up
+# where the last process stopped. db_utils.add_book/update_book enqueue them in
+# the same transaction as the save; the workers here fill in the rest.
+ENRICHMENT_WORKERS = 2
+POLL_SECONDS = 5
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+# A job left 'running' this long belongs to a worker that died; hand it out again
+LEASE_SECONDS = 300
+
+_wake = threading.Event()
+_workers = []
+_start_lock = threading.Lock()
+
+# =====================
+# Job Claiming
+# =====================
+
+def _claim() -> Optional[Tuple[int, int]]:
+    """Mark the next due job running and return (book_id, attempts), or None if nothing is due."""
+    now = time.time()
+    with db_utils.connection() as conn:
+        row = conn.execute("""
+            UPDATE enrichment_jobs
+            SET status = 'running', attempts = attempts + 1, updated_at = ?
+            WHERE book_id = (
+                SELECT book_id FROM enrichment_jobs
+                WHERE (status = 'pending' AND next_attempt_at <= ?)
+                   OR (status = 'running' AND updated_at < ?)
+                ORDER BY next_attempt_at
+                LIMIT 1
+            )
+            RETURNING book_id, attempts
+        """, (now, now, now - LEASE_SECONDS)).fetchone()
+        conn.commit()
+    return (row[0], row[1]) if row else None
+
+def _finish(book_id: int, status: str, error: Optional[str] = None, next_attempt_at: Optional[float] = None):
+    now = time.time()
+    with db_utils.connection() as conn:
+        conn.execute("""
+            UPDATE enrichment_jobs
+            SET status = ?, last_error = ?, next_attempt_at = COALESCE(?, next_attempt_at), updated_at = ?
+            WHERE book_id = ? AND status = 'running'
+        """, (status, error, next_attempt_at, now, book_id))
+        conn.commit()
+
+def _backoff(attempts: int) -> float:
+    return min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+
+# =====================
+# Workers
+# =====================
+
+def _retry(book_id: int, attempts: int, error: str):
+    if attempts >= MAX_ATTEMPTS:
+        _finish(book_id, "failed", error[:500])
+    else:
+        _finish(book_id, "pending", error[:500], time.time() + _backoff(attempts))
+
+def run_job(book_id: int, attempts: int):
+    """
+    Look up one book and fill in its missing fields. 'not_found' means the
+    providers answered without a cover; if they errored or timed out instead,
+    or anything else failed, the job is retried with exponential backoff.
+    """
+    try:
+        with db_utils.connection() as conn:
+            book = conn.execute("""
+                SELECT b.title, a.name, b.isbn
+                FROM books b LEFT JOIN authors a ON b.author_id = a.id
+                WHERE b.id = ?
+            """, (book_id,)).fetchone()
+        if book is None:
+            _finish(book_id, "done")
+            return
+        title, author, isbn = book
+        fetched = db_utils.fetch_book_data(title or "", author, isbn or None)
+        db_utils.apply_enrichment(book_id, fetched)
+        found = fetched.get("cover_url") != providers.PLACEHOLDER_COVER or fetched.get("subjects")
+        _finish(book_id, "done" if found else "not_found")
+    except providers.ProvidersUnavailable as e:
+        # An outage says nothing about the book; ask again later
+        _retry(book_id, attempts, f"providers unavailable: {e}")
+    except Exception as e:
+        _retry(book_id, attempts, str(e))
+
+def drain(limit: Optional[int] = None) -> int:
+    """Run due jobs in this thread until none are left (or limit is reached). Returns how many ran."""
+    ran = 0
+    while limit is None or ran < limit:
+        job = _claim()
+        if job is None:
+            break
+        run_job(*job)
+        ran += 1
+    return ran
+
+def _worker_loop():
+    while True:
+        try:
+            if drain():
+                continue
+        except Exception:
+            pass
+        _wake.wait(POLL_SECONDS)
+        _wake.clear()
+
+def start():
+    """Start the background workers once per process. Cheap to call on every rerun."""
+    with _start_lock:
+        if _workers:
+            return
+        for i in range(ENRICHMENT_WORKERS):
+            worker = threading.Thread(target=_worker_loop, name=f"enrichment-worker-{i}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+def wake():
+    """Nudge the workers after enqueueing so new jobs don't wait for the next poll."""
+    start()
+    _wake.set()
+
+# =====================
+# Status
+# =====================
+
+def job_status(book_id: int) -> Optional[Dict[str, object]]:
+    with db_utils.connection() as conn:
+        row = conn.execute(
+            "SELECT status, attempts, next_attempt_at, last_error FROM enrichment_jobs WHERE book_id = ?",
+            (book_id,)).fetchone()
+    if row is None:
+        return None
+    return {"status": row[0], "attempts": row[1], "next_attempt_at": row[2], "last_error": row[3]}
+
+def summary() -> Dict[str, int]:
+    """Job counts by status, for the maintenance page."""
+    counts = {status: 0 for status in ("pending", "running", "done", "not_found", "failed")}
+    with db_utils.connection() as conn:
+        counts.update(conn.execute("SELECT status, COUNT(*) FROM enrichment_jobs GROUP BY status").fetchall())
+    return counts
+
+def retry_failed() -> int:
+    """Put failed jobs back in the queue with a fresh attempt count."""
+    now = time.time()
+    with db_utils.connection() as conn:
+        changed = conn.execute("""
+            UPDATE enrichment_jobs
+            SET status = 'pending', attempts = 0, next_attempt_at = ?, last_error = NULL, updated_at = ?
+            WHERE status = 'failed'
+        """, (now, now)).rowcount
+        conn.commit()
+    wake()
+    return changed
+
+if __name__ == "__main__":
+    print(f"Ran {drain()} enrichment jobs; queue: {summary()}")
@@ -0,0 +1,68 @@
+import io
+from typing import Optional, Dict, Any, BinaryIO
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from app import db_utils
+
+# Label -> (file extension, MIME type)
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+# Fixed so every chunk, including an all-NULL one, writes the same columns and types
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("title", pa.string()),
+    ("author", pa.string()),
+    ("genre", pa.string()),
+    ("year", pa.int64()),
+    ("isbn", pa.string()),
+    ("subjects", pa.string()),
+    ("cover_url", pa.string()),
+    ("rating", pa.float64()),
+])
+
+# =====================
+# Streaming Writers
+# =====================
+# Rows come from db_utils.iter_books one chunk at a time and each chunk is
+# written out before the next is read, so memory stays flat however many
+# books match.
+
+def _batches(filters: Optional[Dict[str, Any]]):
+    for chunk in db_utils.iter_books(filters):
+        yield pa.RecordBatch.from_pandas(chunk, schema=SCHEMA, preserve_index=False)
+
+def _writer(fmt: str, sink: BinaryIO):
+    if fmt == "CSV":
+        return pa_csv.CSVWriter(sink, SCHEMA)
+    if fmt == "Parquet":
+        return pq.ParquetWriter(sink, SCHEMA, compression="zstd")
+    if fmt == "Arrow":
+        return pa.ipc.new_file(sink, SCHEMA)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+def write_books(filters: Optional[Dict[str, Any]], fmt: str, sink: BinaryIO) -> int:
+    """Write the books matching filters to sink in the given format. Returns the row count."""
+    rows = 0
+    writer = _writer(fmt, sink)
+    try:
+        for batch in _batches(filters):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        writer.close()
+    return rows
+
+def export_bytes(filters: Optional[Dict[str, Any]], fmt: str) -> bytes:
+    """
+    The finished export as bytes, for st.download_button. Streamlit 1.50 needs
+    the whole file in memory, so unlike write_books this peaks at the size of
+    the export; callers should drop the bytes once they've been served.
+    """
+    sink = io.BytesIO()
+    write_books(filters, fmt, sink)
+    return sink.getvalue()
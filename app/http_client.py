@@ -0,0 +1,105 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import (Retrying, RetryCallState, retry_if_exception, retry_if_result,
+                      stop_after_attempt, wait_exponential_jitter)
+
+# Per-attempt limits; a deadline (see below) can shorten them further
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 8
+MAX_ATTEMPTS = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Enough connections per host for the rebuild workers plus the cover queue
+POOL_MAXSIZE = 16
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_deadlines = threading.local()
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised instead of starting a request once the current deadline has passed."""
+
+# =====================
+# Shared Session
+# =====================
+# One keep-alive connection pool for every outbound call (Open Library,
+# Google Books, cover downloads), so repeated lookups skip the TCP and TLS
+# handshakes. urllib3's pool is thread-safe; only plain GETs go through it.
+
+def session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_MAXSIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers["User-Agent"] = "AlejandrosLibrary/1.0 (personal reading dashboard)"
+                _session = s
+    return _session
+
+# =====================
+# Deadlines
+# =====================
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Bound the total time of every get() made by this thread inside the block,
+    retries and backoff included. Nested deadlines never extend an outer one.
+    """
+    previous = getattr(_deadlines, "at", None)
+    at = time.monotonic() + seconds
+    _deadlines.at = at if previous is None else min(at, previous)
+    try:
+        yield
+    finally:
+        _deadlines.at = previous
+
+def remaining() -> Optional[float]:
+    """Seconds left on this thread's deadline, or None if there is none."""
+    at = getattr(_deadlines, "at", None)
+    return None if at is None else at - time.monotonic()
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+# =====================
+# Requests
+# =====================
+
+def _out_of_time(retry_state: RetryCallState) -> bool:
+    left = remaining()
+    return left is not None and left <= (retry_state.upcoming_sleep or 0)
+
+def _transient(exc: BaseException) -> bool:
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout)) and not isinstance(exc, DeadlineExceeded)
+
+def _attempt(url: str, **kwargs) -> requests.Response:
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"deadline passed before GET {url}")
+    connect, read = CONNECT_TIMEOUT, READ_TIMEOUT
+    if left is not None:
+        connect, read = min(connect, left), min(read, left)
+    return session().get(url, timeout=(connect, read), **kwargs)
+
+def get(url: str, **kwargs) -> requests.Response:
+    """
+    GET through the shared session. Connection errors, timeouts and
+    RETRY_STATUSES are retried with jittered exponential backoff, up to
+    MAX_ATTEMPTS or until the current deadline would pass. A response that
+    still has a retryable status is returned as is.
+    """
+    retrying = Retrying(
+        retry=retry_if_exception(_transient) | retry_if_result(lambda r: r.status_code in RETRY_STATUSES),
+        wait=wait_exponential_jitter(initial=0.25, max=2, jitter=0.25),
+        stop=stop_after_attempt(MAX_ATTEMPTS) | _out_of_time,
+        retry_error_callback=lambda retry_state: retry_state.outcome.result(),
+    )
+    return retrying(_attempt, url, **kwargs)
@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+import re
+import time
+from itertools import islice
+from typing import Optional, Dict, Any, Callable, Iterable, Iterator, List, Union, IO
+from app import db_utils
+
+IMPORT_CHUNK_SIZE = 1000
+
+# Column names we accept, including Goodreads and LibraryThing export headers
+COLUMN_ALIASES = {
+    "title": ["title"],
+    "author": ["author", "authors", "primary author", "author l-f"],
+    "genre": ["genre", "exclusive shelf"],
+    "year": ["year", "year read", "date read"],
+    "rating": ["rating", "my rating"],
+    "isbn": ["isbn13", "isbn", "isbns"],
+    "subjects": ["subjects", "bookshelves", "tags"],
+    "cover_url": ["cover_url", "cover"],
+}
+
+# =====================
+# Parsing
+# =====================
+
+def _read_records(stream: IO[str], fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == "jsonl":
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        yield from csv.DictReader(stream)
+
+def _pick(record: Dict[str, Any], field: str) -> Optional[str]:
+    lowered = {str(k).strip().lower(): v for k, v in record.items()}
+    for alias in COLUMN_ALIASES[field]:
+        value = lowered.get(alias)
+        if value is not None and str(value).strip():
+            return str(value).strip()
+    return None
+
+def _normalize_record(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    title = _pick(record, "title")
+    if not title:
+        return None
+
+    year = _pick(record, "year")
+    year_match = re.search(r"\d{4}", year or "")
+
+    rating = _pick(record, "rating")
+    try:
+        rating = float(rating) if rating is not None else None
+    except ValueError:
+        rating = None
+    # Goodreads exports unrated books as 0
+    if rating is not None and rating <= 0:
+        rating = None
+
+    # Goodreads wraps ISBNs as ="9780143127741"
+    isbn = re.sub(r'[="\s]', "", _pick(record, "isbn") or "") or None
+    subjects = _pick(record, "subjects")
+    genre = _pick(record, "genre")
+    if genre in ("read", "to-read", "currently-reading"):
+        genre = None
+
+    return {
+        "title": title,
+        "author": _pick(record, "author") or "Unknown",
+        "genre": genre or (subjects.split(",")[0].strip() if subjects else "Unknown"),
+        "year": int(year_match.group(0)) if year_match else None,
+        "rating": rating,
+        "isbn": isbn,
+        "subjects": subjects,
+        "cover_url": _pick(record, "cover_url"),
+    }
+
+def _chunks(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    it = iter(records)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+# =====================
+# Loading
+# =====================
+
+def _resolve_ids(conn, table: str, names: Iterable[str]) -> Dict[str, int]:
+    """Create any missing names in authors/genres and return a name -> id map for the whole set."""
+    names = sorted(set(names))
+    conn.executemany(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", [(n,) for n in names])
+    placeholders = ",".join("?" * len(names))
+    rows = conn.execute(f"SELECT name, id FROM {table} WHERE name IN ({placeholders})", names).fetchall()
+    return dict(rows)
+
+def _insert_chunk(conn, books: List[Dict[str, Any]]) -> int:
+    author_ids = _resolve_ids(conn, "authors", (b["author"] for b in books))
+    genre_ids = _resolve_ids(conn, "genres", (b["genre"] for b in books))
+
+    book_ids = [
+        conn.execute("""
+            INSERT INTO books (title, author_id, genre_id, year, isbn, subjects, cover_url)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            RETURNING id
+        """, (b["title"], author_ids[b["author"]], genre_ids[b["genre"]], b["year"],
+              b["isbn"], b["subjects"], b["cover_url"])).fetchone()[0]
+        for b in books
+    ]
+    conn.executemany("INSERT INTO ratings (book_id, rating) VALUES (?, ?)",
+                     [(book_id, b["rating"]) for book_id, b in zip(book_ids, books) if b["rating"] is not None])
+    return sum(1 for b in books if not b["cover_url"])
+
+def import_books(source: Union[str, IO], fmt: Optional[str] = None,
+                 chunk_size: int = IMPORT_CHUNK_SIZE,
+                 progress: Optional[Callable[[int, float], None]] = None) -> Dict[str, Any]:
+    """
+    Stream a CSV or JSONL reading list into the library, one transaction per chunk.
+    No covers are fetched here; books without one can be filled in afterwards with
+    db_utils.rebuild_covers(only_missing=True). progress(rows, rows_per_sec) is called
+    after each chunk.
+    """
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    if fmt is None:
+        fmt = "jsonl" if str(name).lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+    if isinstance(source, str):
+        stream = open(source, encoding="utf-8-sig", newline="")
+    elif isinstance(source, io.TextIOBase):
+        stream = source
+    else:
+        stream = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+
+    start = time.perf_counter()
+    imported = skipped = missing_covers = 0
+    try:
+        records = _read_records(stream, fmt)
+        for chunk in _chunks(records, chunk_size):
+            books = [b for b in (_normalize_record(r) for r in chunk) if b]
+            skipped += len(chunk) - len(books)
+            if books:
+                with db_utils.books_transaction() as conn:
+                    missing_covers += _insert_chunk(conn, books)
+                imported += len(books)
+            if progress:
+                elapsed = time.perf_counter() - start
+                progress(imported, imported / elapsed if elapsed else 0.0)
+    finally:
+        if isinstance(source, str):
+            stream.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        "imported": imported,
+        "skipped": skipped,
+        "missing_covers": missing_covers,
+        "seconds": seconds,
+        "rows_per_sec": imported / seconds if seconds else 0.0,
+    }
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        print("usage: python -m app.importer <reading_list.csv|.jsonl>")
+        sys.exit(1)
+    report = import_books(sys.argv[1], progress=lambda n, rate: print(f"{n} rows ({rate:,.0f} rows/s)"))
+    print(f"Imported {report['imported']} books in {report['seconds']:.2f}s "
+          f"({report['rows_per_sec']:,.0f} rows/s), skipped {report['skipped']}, "
+          f"{report['missing_covers']} without covers")
@@ -0,0 +1,254 @@
+import sqlite3
+from typing import List, Tuple, Union, Callable
+
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+# =====================
+# Schema Migrations
+# =====================
+# Applied in order on top of schema.sql. PRAGMA user_version records the last
+# one applied, so existing database files upgrade in place. Append new
+# migrations to the end; never edit one that has shipped. A step is either an
+# SQL statement or a function taking the connection.
+
+def _repair_blob_book_ids(conn: sqlite3.Connection):
+    """numpy int64 ids were once written as 8-byte little-endian blobs; store them as integers."""
+    rows = conn.execute(
+        "SELECT id, book_id FROM ratings WHERE typeof(book_id) = 'blob' AND length(book_id) = 8"
+    ).fetchall()
+    conn.executemany("UPDATE ratings SET book_id = ? WHERE id = ?",
+                     [(int.from_bytes(book_id, "little", signed=True), rating_id) for rating_id, book_id in rows])
+
+MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (1, "Indexes from DESIGN.md plus year, isbn and rating lookups", [
+        "CREATE INDEX IF NOT EXISTS idx_books_author_id ON books(author_id)",
+        "CREATE INDEX IF NOT EXISTS idx_books_genre_id ON books(genre_id)",
+        "CREATE INDEX IF NOT EXISTS idx_ratings_book_id ON ratings(book_id)",
+        "CREATE INDEX IF NOT EXISTS idx_books_year ON books(year)",
+        "CREATE INDEX IF NOT EXISTS idx_books_isbn ON books(isbn)",
+        "CREATE INDEX IF NOT EXISTS idx_ratings_book_rating ON ratings(book_id, rating)",
+        "ANALYZE",
+    ]),
+    (2, "Per-book rating statistics maintained by triggers on ratings", [
+        _repair_blob_book_ids,
+        """
+        CREATE TABLE IF NOT EXISTS book_rating_stats (
+            book_id INTEGER PRIMARY KEY,
+            rating_count INTEGER NOT NULL,
+            rating_sum REAL NOT NULL,
+            rating_mean REAL,
+            rating_min REAL,
+            rating_max REAL,
+            FOREIGN KEY (book_id) REFERENCES books(id)
+        )
+        """,
+        """
+        INSERT OR REPLACE INTO book_rating_stats
+            (book_id, rating_count, rating_sum, rating_mean, rating_min, rating_max)
+        SELECT book_id, COUNT(*), SUM(rating), AVG(rating), MIN(rating), MAX(rating)
+        FROM ratings
+        GROUP BY book_id
+        """,
+        # Inserts fold into the running totals in O(1)
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_ratings_stats_insert AFTER INSERT ON ratings
+        BEGIN
+            INSERT INTO book_rating_stats
+                (book_id, rating_count, rating_sum, rating_mean, rating_min, rating_max)
+            VALUES (NEW.book_id, 1, NEW.rating, NEW.rating, NEW.rating, NEW.rating)
+            ON CONFLICT(book_id) DO UPDATE SET
+                rating_count = rating_count + 1,
+                rating_sum = rating_sum + excluded.rating_sum,
+                rating_mean = (rating_sum + excluded.rating_sum) / (rating_count + 1),
+                rating_min = MIN(rating_min, excluded.rating_min),
+                rating_max = MAX(rating_max, excluded.rating_max);
+        END
+        """,
+        # Deletes subtract from the totals; min/max are re-read from idx_ratings_book_rating
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_ratings_stats_delete AFTER DELETE ON ratings
+        BEGIN
+            UPDATE book_rating_stats SET
+                rating_count = rating_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                rating_mean = CASE WHEN rating_count > 1
+                                   THEN (rating_sum - OLD.rating) / (rating_count - 1) END,
+                rating_min = (SELECT MIN(rating) FROM ratings WHERE book_id = OLD.book_id),
+                rating_max = (SELECT MAX(rating) FROM ratings WHERE book_id = OLD.book_id)
+            WHERE book_id = OLD.book_id;
+            DELETE FROM book_rating_stats WHERE book_id = OLD.book_id AND rating_count <= 0;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_ratings_stats_update AFTER UPDATE OF book_id, rating ON ratings
+        BEGIN
+            UPDATE book_rating_stats SET
+                rating_count = rating_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                rating_mean = CASE WHEN rating_count > 1
+                                   THEN (rating_sum - OLD.rating) / (rating_count - 1) END,
+                rating_min = (SELECT MIN(rating) FROM ratings WHERE book_id = OLD.book_id),
+                rating_max = (SELECT MAX(rating) FROM ratings WHERE book_id = OLD.book_id)
+            WHERE book_id = OLD.book_id;
+            DELETE FROM book_rating_stats WHERE book_id = OLD.book_id AND rating_count <= 0;
+            INSERT INTO book_rating_stats
+                (book_id, rating_count, rating_sum, rating_mean, rating_min, rating_max)
+            VALUES (NEW.book_id, 1, NEW.rating, NEW.rating, NEW.rating, NEW.rating)
+            ON CONFLICT(book_id) DO UPDATE SET
+                rating_count = rating_count + 1,
+                rating_sum = rating_sum + excluded.rating_sum,
+                rating_mean = (rating_sum + excluded.rating_sum) / (rating_count + 1),
+                rating_min = MIN(rating_min, excluded.rating_min),
+                rating_max = MAX(rating_max, excluded.rating_max);
+        END
+        """,
+    ]),
+    (3, "FTS5 search index over title, author and subjects", [
+        # rowid is the book id; prefix indexes keep short prefix queries fast
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            title, author, subjects,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """,
+        # Rank title matches above author matches above subject matches
+        "INSERT INTO books_fts (books_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')",
+        """
+        INSERT INTO books_fts (rowid, title, author, subjects)
+        SELECT b.id, b.title, COALESCE(a.name, ''), COALESCE(b.subjects, '')
+        FROM books b LEFT JOIN authors a ON b.author_id = a.id
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_books_fts_insert AFTER INSERT ON books
+        BEGIN
+            INSERT INTO books_fts (rowid, title, author, subjects)
+            VALUES (NEW.id, NEW.title,
+                    COALESCE((SELECT name FROM authors WHERE id = NEW.author_id), ''),
+                    COALESCE(NEW.subjects, ''));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_books_fts_update AFTER UPDATE OF title, author_id, subjects ON books
+        BEGIN
+            UPDATE books_fts SET
+                title = NEW.title,
+                author = COALESCE((SELECT name FROM authors WHERE id = NEW.author_id), ''),
+                subjects = COALESCE(NEW.subjects, '')
+            WHERE rowid = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_books_fts_delete AFTER DELETE ON books
+        BEGIN
+            DELETE FROM books_fts WHERE rowid = OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_authors_fts_update AFTER UPDATE OF name ON authors
+        BEGIN
+            UPDATE books_fts SET author = NEW.name
+            WHERE rowid IN (SELECT id FROM books WHERE author_id = NEW.id);
+        END
+        """,
+    ]),
+    (4, "Index matching the Bookstacks keyset sort order", [
+        "CREATE INDEX IF NOT EXISTS idx_books_year_title ON books(COALESCE(year, -1) DESC, title, id)",
+        "ANALYZE books",
+    ]),
+    (5, "MinHash signatures and LSH buckets for duplicate detection", [
+        # Filled lazily by app/dedupe.py; the triggers drop rows that go stale
+        """
+        CREATE TABLE IF NOT EXISTS book_minhash (
+            book_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS book_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            book_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, book_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_book_lsh_book_id ON book_lsh(book_id)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_books_minhash_delete AFTER DELETE ON books
+        BEGIN
+            DELETE FROM book_minhash WHERE book_id = OLD.id;
+            DELETE FROM book_lsh WHERE book_id = OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_books_minhash_update AFTER UPDATE OF title, author_id ON books
+        BEGIN
+            DELETE FROM book_minhash WHERE book_id = OLD.id;
+            DELETE FROM book_lsh WHERE book_id = OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_authors_minhash_update AFTER UPDATE OF name ON authors
+        BEGIN
+            DELETE FROM book_minhash WHERE book_id IN (SELECT id FROM books WHERE author_id = NEW.id);
+            DELETE FROM book_lsh WHERE book_id IN (SELECT id FROM books WHERE author_id = NEW.id);
+        END
+        """,
+    ]),
+    (6, "Durable queue of background metadata lookups, one job per book", [
+        # status: pending, running, done, not_found or failed
+        """
+        CREATE TABLE IF NOT EXISTS enrichment_jobs (
+            book_id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            updated_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_enrichment_jobs_due ON enrichment_jobs(status, next_attempt_at)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_books_enrichment_delete AFTER DELETE ON books
+        BEGIN
+            DELETE FROM enrichment_jobs WHERE book_id = OLD.id;
+        END
+        """,
+    ]),
+    (7, "Checkpoint table for resumable cover rebuilds", [
+        """
+        CREATE TABLE IF NOT EXISTS rebuild_checkpoint (
+            book_id INTEGER PRIMARY KEY,
+            updated INTEGER NOT NULL
+        )
+        """,
+    ]),
+]
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """Apply every migration newer than the database's user_version. Returns how many ran."""
+    applied = 0
+    for version, _description, steps in MIGRATIONS:
+        if current_version(conn) >= version:
+            continue
+        # Take the write lock first so two processes can't run the same migration
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            applied += 1
+        except Exception:
+            conn.rollback()
+            raise
+    return applied
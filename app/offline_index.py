@@ -0,0 +1,274 @@
+import functools
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from itertools import islice
+from typing import Optional, Dict, Any, Callable, Iterable, Iterator, List, Tuple
+from app import providers
+
+# Built by `python -m app.offline_index build <dump>...`; the provider is a
+# no-op until this file exists.
+INDEX_PATH = os.getenv("OPENLIBRARY_INDEX", "openlibrary_index.db")
+BUILD_BATCH_SIZE = 5000
+
+_local = threading.local()
+
+# =====================
+# Index Schema
+# =====================
+# authors, works and editions hold only what enrichment needs. isbns maps every
+# ISBN (as ISBN-13 where possible) to an edition; titles maps normalized
+# title + first author to a work or edition.
+
+SCHEMA = [
+    "CREATE TABLE authors (key TEXT PRIMARY KEY, name TEXT) WITHOUT ROWID",
+    """
+    CREATE TABLE works (
+        key TEXT PRIMARY KEY, title TEXT, author_key TEXT, cover_id INTEGER, subjects TEXT
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE editions (
+        key TEXT PRIMARY KEY, work_key TEXT, title TEXT, author_key TEXT,
+        cover_id INTEGER, subjects TEXT, isbn TEXT
+    ) WITHOUT ROWID
+    """,
+    "CREATE TABLE isbns (isbn TEXT PRIMARY KEY, edition_key TEXT NOT NULL) WITHOUT ROWID",
+    """
+    CREATE TABLE titles (
+        norm_title TEXT NOT NULL, norm_author TEXT NOT NULL, work_key TEXT, edition_key TEXT
+    )
+    """,
+]
+
+# Created after loading; bulk inserts into unindexed tables are much faster
+POST_LOAD = [
+    "CREATE INDEX idx_editions_work ON editions(work_key, cover_id)",
+    "CREATE INDEX idx_titles_lookup ON titles(norm_title, norm_author)",
+    "ANALYZE",
+]
+
+# =====================
+# Dump Parsing
+# =====================
+# Open Library dumps are tab-separated: type, key, revision, last_modified, JSON.
+
+def _open_dump(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+def _first_key(refs, nested: Optional[str] = None) -> Optional[str]:
+    for ref in refs or []:
+        if nested and isinstance(ref, dict):
+            ref = ref.get(nested)
+        if isinstance(ref, dict) and ref.get("key"):
+            return ref["key"]
+    return None
+
+def _first_cover(covers) -> Optional[int]:
+    # Deleted covers show up as -1
+    return next((c for c in covers or [] if isinstance(c, int) and c > 0), None)
+
+def _subjects(record: Dict[str, Any]) -> Optional[str]:
+    subjects = [s for s in record.get("subjects") or [] if isinstance(s, str)]
+    return ", ".join(subjects[:5]) or None
+
+def _parse(lines: Iterable[str]) -> Iterator[Tuple[str, tuple]]:
+    """Yield (table, row) for every author, work and edition record."""
+    for line in lines:
+        parts = line.rstrip("\n").split("\t", 4)
+        if len(parts) != 5 or parts[0] not in ("/type/author", "/type/work", "/type/edition"):
+            continue
+        try:
+            record = json.loads(parts[4])
+        except ValueError:
+            continue
+        key = parts[1]
+        if parts[0] == "/type/author":
+            yield "authors", (key, record.get("name"))
+        elif parts[0] == "/type/work":
+            yield "works", (key, record.get("title"), _first_key(record.get("authors"), "author"),
+                            _first_cover(record.get("covers")), _subjects(record))
+        else:
+            isbns = [i for i in (record.get("isbn_13") or []) + (record.get("isbn_10") or []) if isinstance(i, str)]
+            canonical = [c for c in map(providers.canonical_isbn, isbns) if c]
+            yield "editions", (key, _first_key(record.get("works")), record.get("title"),
+                               _first_key(record.get("authors")), _first_cover(record.get("covers")),
+                               _subjects(record), canonical[0] if canonical else None)
+            for isbn in dict.fromkeys(canonical):
+                yield "isbns", (isbn, key)
+
+_INSERTS = {
+    "authors": "INSERT OR REPLACE INTO authors VALUES (?, ?)",
+    "works": "INSERT OR REPLACE INTO works VALUES (?, ?, ?, ?, ?)",
+    "editions": "INSERT OR REPLACE INTO editions VALUES (?, ?, ?, ?, ?, ?, ?)",
+    "isbns": "INSERT OR REPLACE INTO isbns VALUES (?, ?)",
+}
+
+# =====================
+# Building
+# =====================
+
+def _build_titles(conn: sqlite3.Connection):
+    """Normalized title/author keys for every work, and for editions that have no work."""
+    rows = conn.execute("""
+        SELECT w.title, a.name, w.key, NULL FROM works w LEFT JOIN authors a ON a.key = w.author_key
+        UNION ALL
+        SELECT e.title, a.name, NULL, e.key FROM editions e LEFT JOIN authors a ON a.key = e.author_key
+        WHERE e.work_key IS NULL OR e.work_key NOT IN (SELECT key FROM works)
+    """)
+    while True:
+        batch = rows.fetchmany(BUILD_BATCH_SIZE)
+        if not batch:
+            break
+        conn.executemany("INSERT INTO titles VALUES (?, ?, ?, ?)", [
+            (providers.normalize_text(title), providers.normalize_text(author or ""), work_key, edition_key)
+            for title, author, work_key, edition_key in batch if title
+        ])
+
+def build(dump_paths: List[str], index_path: Optional[str] = None,
+          progress: Optional[Callable[[int, float], None]] = None) -> Dict[str, Any]:
+    """
+    Build the index from Open Library author, work and edition dumps (plain or
+    .gz, any order, streamed line by line). The new index replaces the old one
+    atomically when complete. progress(records, records_per_sec) is called per batch.
+    """
+    index_path = index_path or INDEX_PATH
+    tmp_path = f"{index_path}.building"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    start = time.perf_counter()
+    records = 0
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        for path in dump_paths:
+            with _open_dump(path) as lines:
+                parsed = _parse(lines)
+                while True:
+                    batch = list(islice(parsed, BUILD_BATCH_SIZE))
+                    if not batch:
+                        break
+                    by_table: Dict[str, list] = {}
+                    for table, row in batch:
+                        by_table.setdefault(table, []).append(row)
+                    for table, rows in by_table.items():
+                        conn.executemany(_INSERTS[table], rows)
+                    conn.commit()
+                    records += len(batch)
+                    if progress:
+                        elapsed = time.perf_counter() - start
+                        progress(records, records / elapsed if elapsed else 0.0)
+        _build_titles(conn)
+        for statement in POST_LOAD:
+            conn.execute(statement)
+        conn.commit()
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("authors", "works", "editions", "isbns", "titles")}
+    finally:
+        conn.close()
+    os.replace(tmp_path, index_path)
+    return {**counts, "seconds": time.perf_counter() - start}
+
+# =====================
+# Lookups
+# =====================
+
+def _index_version(index_path: str) -> Optional[float]:
+    try:
+        return os.stat(index_path).st_mtime
+    except OSError:
+        return None
+
+def _connection(index_path: str, version: float) -> sqlite3.Connection:
+    """Read-only connection per thread, reopened when the index file is rebuilt."""
+    cached = getattr(_local, "conn", None)
+    if cached is not None and cached[0] == (index_path, version):
+        return cached[1]
+    if cached is not None:
+        cached[1].close()
+    conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True, check_same_thread=False)
+    _local.conn = ((index_path, version), conn)
+    return conn
+
+def _cover_url(cover_id: Optional[int]) -> Optional[str]:
+    return f"https://covers.openlibrary.org/b/id/{cover_id}-L.jpg" if cover_id else None
+
+def _from_edition(conn: sqlite3.Connection, edition_key: str) -> Optional[providers.BookData]:
+    row = conn.execute("""
+        SELECT e.cover_id, w.cover_id, e.isbn, e.subjects, w.subjects
+        FROM editions e LEFT JOIN works w ON w.key = e.work_key
+        WHERE e.key = ?
+    """, (edition_key,)).fetchone()
+    if row is None:
+        return None
+    edition_cover, work_cover, isbn, edition_subjects, work_subjects = row
+    return {"cover_url": _cover_url(edition_cover or work_cover), "isbn": isbn,
+            "subjects": edition_subjects or work_subjects}
+
+def _from_work(conn: sqlite3.Connection, work_key: str) -> Optional[providers.BookData]:
+    work = conn.execute("SELECT cover_id, subjects FROM works WHERE key = ?", (work_key,)).fetchone()
+    if work is None:
+        return None
+    # Prefer an edition that has both a cover and an ISBN
+    edition = conn.execute("""
+        SELECT cover_id, isbn FROM editions WHERE work_key = ?
+        ORDER BY cover_id IS NULL, isbn IS NULL LIMIT 1
+    """, (work_key,)).fetchone() or (None, None)
+    return {"cover_url": _cover_url(work[0] or edition[0]), "isbn": edition[1], "subjects": work[1]}
+
+@functools.lru_cache(maxsize=4096)
+def _lookup(index_path: str, version: float, title: str, author: Optional[str],
+            isbn: Optional[str]) -> Optional[providers.BookData]:
+    conn = _connection(index_path, version)
+    canonical = providers.canonical_isbn(isbn) if isbn else None
+    if canonical:
+        row = conn.execute("SELECT edition_key FROM isbns WHERE isbn = ?", (canonical,)).fetchone()
+        if row:
+            found = _from_edition(conn, row[0])
+            if found:
+                found["isbn"] = isbn
+                return found
+
+    norm_title = providers.normalize_text(title)
+    if not norm_title:
+        return None
+    if author:
+        row = conn.execute("SELECT work_key, edition_key FROM titles WHERE norm_title = ? AND norm_author = ? LIMIT 1",
+                           (norm_title, providers.normalize_text(author))).fetchone()
+    else:
+        row = conn.execute("SELECT work_key, edition_key FROM titles WHERE norm_title = ? LIMIT 1",
+                           (norm_title,)).fetchone()
+    if row is None:
+        return None
+    return _from_work(conn, row[0]) if row[0] else _from_edition(conn, row[1])
+
+def lookup(title: str, author: Optional[str], isbn: Optional[str]) -> Optional[providers.BookData]:
+    """Cover, ISBN and subjects from the local index by ISBN, then exact title + author. None on a miss."""
+    version = _index_version(INDEX_PATH)
+    if version is None:
+        return None
+    found = _lookup(INDEX_PATH, version, title or "", author or None, isbn or None)
+    # Callers may fill in the returned dict; keep the cached one intact
+    return dict(found) if found else None
+
+# Checked before any network provider
+providers.register("offline_index", first=True)(lookup)
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3 or sys.argv[1] != "build":
+        print("usage: python -m app.offline_index build <ol_dump_authors.txt.gz> <ol_dump_works.txt.gz> "
+              "<ol_dump_editions.txt.gz> ...")
+        sys.exit(1)
+    report = build(sys.argv[2:], progress=lambda n, rate: print(f"\r{n} records ({rate:,.0f}/s)", end="", flush=True))
+    print(f"\nIndexed {report['editions']} editions, {report['works']} works, {report['authors']} authors "
+          f"({report['isbns']} ISBNs) in {report['seconds']:.1f}s -> {INDEX_PATH}")
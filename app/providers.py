@@ -0,0 +1,391 @@
+import functools
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from difflib import SequenceMatcher
+from typing import Optional, Dict, List, Tuple, Callable, Any, TypedDict
+import numpy as np
+from app import http_client
+
+PLACEHOLDER_COVER = "https://via.placeholder.com/256x384.png?text=No+Cover"
+
+# Comma-separated provider names to run, in order. Unset runs every
+# registered provider in registration order; leaving a name out disables it.
+PROVIDERS_ENV = "METADATA_PROVIDERS"
+
+# Seconds to wait on a provider before also starting the next one ("off" waits
+# for it to fail). Answers are still taken in provider order.
+HEDGE_DELAY_ENV = "METADATA_HEDGE_DELAY"
+HEDGE_DELAY_SECONDS = 0.4
+# Provider calls one lookup may have running at once, on its own threads, so
+# calls abandoned by one lookup never hold up another's. Concurrent lookups
+# times this should stay within http_client.POOL_MAXSIZE connections.
+HEDGE_MAX_IN_FLIGHT = 2
+
+# Open Library search: fetch a page of candidates and rank them locally
+SEARCH_LIMIT = 10
+SEARCH_FIELDS = "title,author_name,cover_i,isbn,subject"
+# Weights for title similarity, author similarity, has cover, has ISBN
+RANK_WEIGHTS = np.array([0.6, 0.25, 0.1, 0.05])
+MIN_TITLE_SIMILARITY = 0.6
+
+class BookData(TypedDict):
+    cover_url: Optional[str]
+    isbn: Optional[str]
+    subjects: Optional[str]
+
+Provider = Callable[[str, Optional[str], Optional[str]], Optional[BookData]]
+
+class ProvidersUnavailable(Exception):
+    """No provider found a cover, but some errored or ran out of time, so the miss may not be real."""
+    def __init__(self, names: List[str]):
+        super().__init__("no answer from " + ", ".join(names))
+        self.names = names
+
+_registry: Dict[str, Provider] = {}
+_stats: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+# =====================
+# Registry
+# =====================
+# A provider takes (title, author, isbn) and returns BookData with whatever
+# it found, or None. Network and HTTP errors propagate; _call catches and
+# counts them, so stats() shows which provider is failing.
+
+def register(name: str, first: bool = False):
+    """Add a provider to the default order: last, or ahead of the others with first=True."""
+    def decorator(fn: Provider) -> Provider:
+        global _registry
+        _registry.pop(name, None)
+        _registry = {name: fn, **_registry} if first else {**_registry, name: fn}
+        return fn
+    return decorator
+
+def active_providers() -> List[str]:
+    configured = os.getenv(PROVIDERS_ENV, "").strip()
+    if not configured:
+        return list(_registry)
+    names = [n.strip() for n in configured.split(",") if n.strip()]
+    return [n for n in names if n in _registry]
+
+def _empty_stats() -> Dict[str, float]:
+    return {"calls": 0, "covers": 0, "isbns": 0, "subjects": 0, "errors": 0, "seconds": 0.0}
+
+def _record(name: str, result: Optional[BookData], seconds: float, error: bool):
+    with _lock:
+        s = _stats.setdefault(name, _empty_stats())
+        s["calls"] += 1
+        s["seconds"] += seconds
+        s["errors"] += int(error)
+        if result:
+            s["covers"] += int(bool(result.get("cover_url")))
+            s["isbns"] += int(bool(result.get("isbn")))
+            s["subjects"] += int(bool(result.get("subjects")))
+
+def stats() -> List[Dict[str, Any]]:
+    """Per-provider call counts, mean latency and how often each field was filled, for this process."""
+    active = set(active_providers())
+    rows = []
+    with _lock:
+        for name in _registry:
+            s = dict(_stats.get(name, _empty_stats()))
+            calls = s["calls"]
+            rows.append({
+                "provider": name,
+                "enabled": name in active,
+                "calls": int(calls),
+                "avg_ms": round(1000 * s["seconds"] / calls, 1) if calls else None,
+                "cover_rate": s["covers"] / calls if calls else None,
+                "isbn_rate": s["isbns"] / calls if calls else None,
+                "subject_rate": s["subjects"] / calls if calls else None,
+                "errors": int(s["errors"]),
+            })
+    return rows
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+# =====================
+# Pipeline
+# =====================
+
+def _call(name: str, title: str, author: Optional[str],
+          isbn: Optional[str]) -> Tuple[Optional[BookData], bool]:
+    """Run one provider; returns (result, errored)."""
+    start = time.perf_counter()
+    result, error = None, False
+    try:
+        result = _registry[name](title, author, isbn)
+    except Exception:
+        error = True
+    _record(name, result, time.perf_counter() - start, error)
+    return result, error
+
+def _has_cover(outcome: Optional[Tuple[Optional[BookData], bool]]) -> bool:
+    return bool(outcome and outcome[0] and outcome[0].get("cover_url"))
+
+def _hedge_delay() -> Optional[float]:
+    configured = os.getenv(HEDGE_DELAY_ENV, "").strip().lower()
+    if not configured:
+        return HEDGE_DELAY_SECONDS
+    return None if configured == "off" else max(float(configured), 0.0)
+
+def _first_by_priority(tasks: List[Callable[[], Any]], accept: Callable[[Any], bool],
+                       delay: Optional[float]) -> Tuple[Optional[int], List[Any]]:
+    """
+    Run tasks on a pool of this call's own, starting the next one every
+    `delay` seconds (0 as soon as possible, None only after the earlier ones
+    failed) and immediately whenever every started task has finished
+    unaccepted, with at most HEDGE_MAX_IN_FLIGHT running. Returns the index
+    of the first task in list order whose result is accepted, and the results
+    so far (None where unknown). Tasks still running finish in the background
+    and are ignored. If the current http_client deadline passes first, the
+    best finished result is returned.
+    """
+    left = http_client.remaining()
+    end = None if left is None else time.monotonic() + left
+
+    def run(task):
+        # Deadlines are per thread, so carry the caller's into the pool
+        if end is None:
+            return task()
+        with http_client.deadline(end - time.monotonic()):
+            return task()
+
+    pool = ThreadPoolExecutor(max_workers=HEDGE_MAX_IN_FLIGHT, thread_name_prefix="provider")
+    futures: List[Future] = []
+    results: List[Any] = [None] * len(tasks)
+    next_start = time.monotonic()
+    resolved = 0
+    try:
+        while True:
+            now = time.monotonic()
+            while len(futures) < len(tasks) and (
+                    resolved == len(futures) or (
+                        delay is not None and now >= next_start
+                        and sum(not f.done() for f in futures[resolved:]) < HEDGE_MAX_IN_FLIGHT)):
+                futures.append(pool.submit(run, tasks[len(futures)]))
+                next_start = now + (delay or 0)
+            while resolved < len(futures) and futures[resolved].done():
+                results[resolved] = futures[resolved].result()
+                if accept(results[resolved]):
+                    return resolved, results
+                resolved += 1
+            if resolved == len(tasks):
+                return None, results
+
+            pending = [f for f in futures[resolved:] if not f.done()]
+            # Only wake for the next hedge when there's room to start it; at the cap,
+            # sleep until a running task finishes (or the deadline)
+            can_hedge = (delay is not None and len(futures) < len(tasks)
+                         and len(pending) < HEDGE_MAX_IN_FLIGHT)
+            timeout = max(next_start - now, 0) if can_hedge else None
+            if end is not None:
+                if now >= end:
+                    # Out of time: settle for the best result that has come back
+                    for i, future in enumerate(futures[resolved:], resolved):
+                        if future.done():
+                            results[i] = future.result()
+                            if accept(results[i]):
+                                return i, results
+                    return None, results
+                timeout = end - now if timeout is None else min(timeout, end - now)
+            wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def lookup(title: str, author: Optional[str], isbn: Optional[str]) -> BookData:
+    """
+    Ask the active providers in order for a cover; the first one that finds
+    it wins, so a later provider's answer is only used once every earlier
+    provider has missed. Providers are hedged: the next one starts after
+    METADATA_HEDGE_DELAY seconds instead of waiting for the previous to fail.
+    ISBN and subjects from providers ahead of the winner fill its gaps.
+    Falls back to PLACEHOLDER_COVER when every provider answered without a
+    cover; raises ProvidersUnavailable instead if any of them errored or
+    didn't finish in time. Callers bound the total time with http_client.deadline.
+    """
+    # Ignore ISBNs that can't be one (blank, 'nan' from pandas) rather than asking providers about them
+    isbn = str(isbn).strip() if canonical_isbn(isbn) else None
+    names = active_providers()
+    tasks = [functools.partial(_call, name, title, author, isbn) for name in names]
+    winner, outcomes = _first_by_priority(tasks, _has_cover, _hedge_delay())
+    if winner is None:
+        failed = [name for name, outcome in zip(names, outcomes) if outcome is None or outcome[1]]
+        if failed:
+            raise ProvidersUnavailable(failed)
+    results = [outcome[0] if outcome else None for outcome in outcomes]
+
+    found: BookData = {"cover_url": None, "isbn": None, "subjects": None}
+    for result in results[:len(results) if winner is None else winner + 1]:
+        for field in ("isbn", "subjects"):
+            found[field] = found[field] or (result or {}).get(field)
+    return {
+        "cover_url": results[winner]["cover_url"] if winner is not None else PLACEHOLDER_COVER,
+        "isbn": isbn or found["isbn"],
+        "subjects": found["subjects"],
+    }
+
+# =====================
+# Matching Helpers
+# =====================
+
+def normalize_text(s: str) -> str:
+    s = s or ""
+    s = s.strip().lower()
+    s = re.sub(r"[’'`]", "'", s)
+    s = re.sub(r"[^a-z0-9\s:,-]", " ", s)
+    s = re.sub(r"\s+", " ", s)
+    return s.strip()
+
+def canonical_isbn(isbn: Optional[str]) -> Optional[str]:
+    """Strip separators and promote ISBN-10 to ISBN-13 so both spellings share a cache key."""
+    s = re.sub(r"[^0-9Xx]", "", str(isbn or "")).upper()
+    if len(s) == 10 and s[:9].isdigit():
+        core = "978" + s[:9]
+        check = (10 - sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(core)) % 10) % 10
+        return core + str(check)
+    if len(s) == 13 and s.isdigit():
+        return s
+    return None
+
+@functools.lru_cache(maxsize=4096)
+def _normalized(s: str) -> str:
+    return normalize_text(s)
+
+def title_similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, _normalized(a or ""), _normalized(b or "")).ratio()
+
+def _best_similarity(matcher: SequenceMatcher, candidates: List[str]) -> float:
+    """Highest ratio of any candidate against the matcher's query (its seq2, analysed once)."""
+    best = 0.0
+    for candidate in candidates:
+        matcher.set_seq1(_normalized(candidate))
+        best = max(best, matcher.ratio())
+    return best
+
+def rank_docs(docs: List[Dict[str, Any]], title: str, author: Optional[str]) -> np.ndarray:
+    """
+    Match score for each Open Library search doc, higher is better: title and
+    author similarity plus a little for having a cover and an ISBN. Docs whose
+    title (or main title, before any subtitle) is too far from the query score -inf.
+    """
+    title_matcher = SequenceMatcher(None, "", _normalized(title or ""), autojunk=False)
+    author_matcher = SequenceMatcher(None, "", _normalized(author), autojunk=False) if author else None
+    features = np.zeros((len(docs), len(RANK_WEIGHTS)))
+    for i, doc in enumerate(docs):
+        doc_title = str(doc.get("title") or "")
+        features[i, 0] = _best_similarity(title_matcher, [doc_title, doc_title.split(":")[0]])
+        if author_matcher is not None:
+            features[i, 1] = _best_similarity(author_matcher, [str(a) for a in (doc.get("author_name") or [])[:5]])
+    features[:, 2] = [bool(doc.get("cover_i")) for doc in docs]
+    features[:, 3] = [bool(doc.get("isbn")) for doc in docs]
+    scores = features @ RANK_WEIGHTS
+    scores[features[:, 0] < MIN_TITLE_SIMILARITY] = -np.inf
+    return scores
+
+# =====================
+# Open Library
+# =====================
+
+def _raise_for_error(r):
+    """Raise for server errors and rate limiting; other statuses are answers (404: not there)."""
+    if r.status_code == 429 or r.status_code >= 500:
+        r.raise_for_status()
+
+def fetch_cover_by_isbn(isbn: str) -> Optional[str]:
+    if not isbn:
+        return None
+    r = http_client.get(f"https://openlibrary.org/isbn/{isbn}.json")
+    _raise_for_error(r)
+    if r.status_code == 200:
+        js = r.json()
+        if isinstance(js, dict) and "covers" in js and js["covers"]:
+            cover_id = js["covers"][0]
+            return f"https://covers.openlibrary.org/b/id/{cover_id}-L.jpg"
+    return f"https://covers.openlibrary.org/b/isbn/{isbn}-L.jpg"
+
+def _openlibrary_search_doc(params: Dict[str, str], title: str, author: Optional[str]) -> Optional[BookData]:
+    """Best-ranked search hit for params, or None if nothing matched. Raises if the search failed."""
+    r = http_client.get("https://openlibrary.org/search.json",
+                        params={**params, "fields": SEARCH_FIELDS, "limit": SEARCH_LIMIT})
+    _raise_for_error(r)
+    if r.status_code != 200:
+        return None
+    docs = (r.json() or {}).get("docs", []) or []
+    if not docs:
+        return None
+    scores = rank_docs(docs, title, author)
+    if not np.isfinite(scores.max()):
+        return None
+    best = docs[int(np.argmax(scores))]
+    cover_url = f"https://covers.openlibrary.org/b/id/{best['cover_i']}-L.jpg" if "cover_i" in best else None
+    isbn = (best.get("isbn") or [None])[0]
+    subjects = ", ".join((best.get("subject") or [])[:5]) if best.get("subject") else None
+    return {"cover_url": cover_url, "isbn": isbn, "subjects": subjects}
+
+def fetch_openlibrary_best(title: str, author: Optional[str]) -> Dict[str, Optional[str]]:
+    attempts = []
+    if author:
+        attempts.append({"title": title, "author": author})
+    attempts.append({"title": title})
+    attempts.append({"q": f"{title} {author or ''}".strip()})
+
+    for params in attempts:
+        found = _openlibrary_search_doc(params, title, author)
+        if found:
+            return found
+    return {"cover_url": None, "isbn": None, "subjects": None}
+
+@register("openlibrary_isbn")
+def _openlibrary_isbn(title: str, author: Optional[str], isbn: Optional[str]) -> Optional[BookData]:
+    if not isbn:
+        return None
+    return {"cover_url": fetch_cover_by_isbn(isbn), "isbn": isbn, "subjects": None}
+
+# Each search variant is its own provider so lookup() can hedge across them
+
+@register("openlibrary_title_author")
+def _openlibrary_title_author(title: str, author: Optional[str], isbn: Optional[str]) -> Optional[BookData]:
+    return _openlibrary_search_doc({"title": title, "author": author}, title, author) if author else None
+
+@register("openlibrary_title")
+def _openlibrary_title(title: str, author: Optional[str], isbn: Optional[str]) -> Optional[BookData]:
+    return _openlibrary_search_doc({"title": title}, title, author)
+
+@register("openlibrary_query")
+def _openlibrary_query(title: str, author: Optional[str], isbn: Optional[str]) -> Optional[BookData]:
+    return _openlibrary_search_doc({"q": f"{title} {author or ''}".strip()}, title, author)
+
+# =====================
+# Google Books
+# =====================
+
+def fetch_cover_google_books(title: str, author: Optional[str]) -> Optional[str]:
+    q = f'intitle:"{title}"'
+    if author:
+        q += f'+inauthor:"{author}"'
+    r = http_client.get("https://www.googleapis.com/books/v1/volumes", params={"q": q, "maxResults": 5})
+    _raise_for_error(r)
+    if r.status_code != 200:
+        return None
+    items = (r.json() or {}).get("items", [])
+    for it in items:
+        links = (it.get("volumeInfo") or {}).get("imageLinks") or {}
+        for key in ["extraLarge", "large", "medium", "small", "thumbnail"]:
+            if links.get(key):
+                return links[key]
+    return None
+
+@register("google_books")
+def _google_books(title: str, author: Optional[str], isbn: Optional[str]) -> Optional[BookData]:
+    cover = fetch_cover_google_books(title, author)
+    return {"cover_url": cover, "isbn": None, "subjects": None} if cover else None
+
+# The local Open Library index registers itself ahead of the network
+# providers; importing it here means any user of the registry gets it.
+from app import offline_index  # noqa: E402,F401
@@ -1,12 +1,22 @@
 import streamlit as st
 import pandas as pd
-from app import db_utils
+from typing import Optional
+from app import db_utils, cover_queue, cover_store
 
 # 🎨 Theme colors
 KPI_BROWN = "#4b3a26"
 KPI_BROWN_DARK = "#2f2419"
 PARCHMENT = "#e6ddc5"
 
+# Shown while a cover is being looked up in the background
+LOADING_COVER = (
+    "data:image/svg+xml;utf8,"
+    "<svg xmlns='http://www.w3.org/2000/svg' width='256' height='384'>"
+    "<rect width='100%25' height='100%25' fill='%234b3a26'/>"
+    "<text x='50%25' y='50%25' fill='white' font-family='Georgia' font-size='22' "
+    "text-anchor='middle'>Fetching cover...</text></svg>"
+)
+
 # =====================
 # Shared CSS Styling
 # =====================
@@ -381,9 +391,22 @@ def show_book_grid(df: pd.DataFrame):
 
     if not df.empty:
         cols = st.columns(5, gap="small")
+        waiting = 0
+        # Locally stored thumbnails where we have them; the rest are downloaded in the background
+        local_covers, to_store = cover_store.local_sources(u.strip() for u in df["cover_url"] if isinstance(u, str))
+        for url in to_store:
+            cover_queue.request_store(url)
         for i, (_, row) in enumerate(df.iterrows()):
             with cols[i % 5]:
-                cover_url = db_utils.get_or_fetch_cover_for_row(row)
+                # Never block the grid on the network; missing covers resolve in the background
+                cover_url = row.get("cover_url")
+                cover_url = cover_url.strip() if isinstance(cover_url, str) else ""
+                if not cover_url:
+                    cover_queue.request_cover(row)
+                    cover_url = LOADING_COVER
+                    waiting += 1
+                else:
+                    cover_url = local_covers.get(cover_url, cover_url)
                 link = db_utils.openlibrary_link(row.get("title"), row.get("author"), row.get("isbn"))
                 rating = row.get("rating", "N/A")
                 genre = row.get("genre", "Unknown")
@@ -402,9 +425,30 @@ def show_book_grid(df: pd.DataFrame):
                     """,
                     unsafe_allow_html=True,
                 )
+        if waiting:
+            st.caption(f"Fetching {waiting} cover(s) in the background. They will appear on the next refresh.")
     else:
         st.info("No books yet — add your first one below!")
 
+# =====================
+# Book Picker
+# =====================
+def book_picker(label: str, key: str) -> Optional[int]:
+    """
+    Search box plus a selectbox of the top matches; returns the chosen book id.
+    Only db_utils.PICKER_LIMIT options are sent to the browser, whatever the library size.
+    """
+    query = st.text_input("Search by title or author", key=f"{key}_search")
+    matches = db_utils.find_books(query)
+    if matches.empty:
+        st.info("No matching books." if query.strip() else "No books yet.")
+        return None
+    labels = {
+        int(r.id): f"#{int(r.id)} — {r.title} by {r.author} ({int(r.year) if pd.notna(r.year) else '—'})"
+        for r in matches.itertuples()
+    }
+    return st.selectbox(label, list(labels), format_func=labels.get, key=f"{key}_select")
+
 # =====================
 # Dashboard Title
 # =====================
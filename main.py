@@ -1,12 +1,19 @@
 import streamlit as st
-import base64
 import os
 import random
 import pandas as pd
 from dotenv import load_dotenv
 import app.db_utils as db_utils
+import app.enrichment_cache as enrichment_cache
+import app.providers as providers
+import app.importer as importer
 import app.ui as ui
 import app.analytics as analytics
+import app.assets as assets
+import app.cover_store as cover_store
+import app.dedupe as dedupe
+import app.enrichment_queue as enrichment_queue
+import app.export as export
 
 # =====================
 # Load environment variables
@@ -38,6 +45,8 @@ ui.inject_custom_css()
 # Data
 # =====================
 df = db_utils.get_books()
+# Background metadata lookups queued by earlier saves (including before a restart)
+enrichment_queue.start()
 
 # =====================
 # Sidebar Navigation
@@ -57,16 +66,17 @@ if "page" not in st.session_state:
 
 page = selected_page or st.session_state["page"]
 
-# Bookworm image
-bookworm_path = "bookworm.png"
-if os.path.exists(bookworm_path):
-    with open(bookworm_path, "rb") as f:
-        worm_bytes = f.read()
-    worm_base64 = base64.b64encode(worm_bytes).decode()
+# A prepared export is only kept while its download button is on screen
+if page != "Bookstacks":
+    st.session_state.pop("stack_export", None)
+
+# Bookworm image (shown at 120px, encoded at 2x for high-DPI screens)
+worm_src = assets.image_src("bookworm.png", 240)
+if worm_src:
     st.sidebar.markdown(
         f"""
         <div class="sidebar-bookworm">
-            <img src="data:image/png;base64,{worm_base64}" alt="Bookworm"/>
+            <img src="{worm_src}" alt="Bookworm"/>
         </div>
         """,
         unsafe_allow_html=True
@@ -76,15 +86,12 @@ if os.path.exists(bookworm_path):
 # Page: Library
 # =====================
 if page == "Library":
-    banner_path = "banner.JPG"
-    if os.path.exists(banner_path):
-        with open(banner_path, "rb") as f:
-            banner_bytes = f.read()
-        banner_base64 = base64.b64encode(banner_bytes).decode()
+    banner_src = assets.image_src("banner.JPG", 1600)
+    if banner_src:
         st.markdown(
             f"""
             <div style="position: relative; width: 100%; overflow: hidden;">
-                <img src="data:image/jpg;base64,{banner_base64}"
+                <img src="{banner_src}"
                     style="width:100%; height:auto; border-radius: 0 0 12px 12px; filter: brightness(60%);">
                 <div style="position: absolute; top: 50%; left: 50%; transform: translate(-50%, -50%);
                             text-align: center; padding: 0 20px;">
@@ -124,43 +131,68 @@ if page == "Library":
 # Page: Computer Lab Dashboard
 # =====================
 elif page == "Computer Lab Dashboard":
-    analytics.show_charts(df)
+    analytics.show_charts()
 
 # =====================
 # Page: Bookstacks
 # =====================
 elif page == "Bookstacks":
-    filtered_df = df.copy()
     with st.expander("Filter Books", expanded=False):
-        search_query = st.text_input("Search by title or author")
-        genres = sorted(df["genre"].dropna().unique())
-        genre_filter = st.selectbox("Filter by genre", ["All"] + genres)
-        if not df["year"].dropna().empty:
-            years = sorted(df["year"].dropna().unique())
-            year_filter = st.selectbox("Filter by year", ["All"] + [str(y) for y in years])
+        search_query = st.text_input("Search by title, author, or subject")
+        options = db_utils.get_filter_options()
+        genre_filter = st.selectbox("Filter by genre", ["All"] + options["genres"])
+        if options["years"]:
+            year_filter = st.selectbox("Filter by year", ["All"] + [str(y) for y in options["years"]])
         else:
             year_filter = "All"
 
-        if search_query:
-            filtered_df = filtered_df[
-                filtered_df["title"].str.contains(search_query, case=False) |
-                filtered_df["author"].str.contains(search_query, case=False)
-            ]
-        if genre_filter != "All":
-            filtered_df = filtered_df[filtered_df["genre"] == genre_filter]
-        if year_filter != "All":
-            filtered_df = filtered_df[filtered_df["year"].astype(str) == year_filter]
-
-    ui.show_book_grid(filtered_df)
-
-    if not filtered_df.empty:
+    filters = {"search": search_query.strip(), "genre": genre_filter, "year": year_filter}
+
+    # Page cursors restart whenever the filters change
+    if st.session_state.get("stack_filters") != filters:
+        st.session_state["stack_filters"] = filters
+        st.session_state["stack_cursors"] = [None]
+    cursors = st.session_state["stack_cursors"]
+
+    page_df, next_cursor = db_utils.get_books_page(filters, cursors[-1])
+    ui.show_book_grid(page_df)
+    db_utils.prefetch_books_page(filters, next_cursor)
+
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if len(cursors) > 1 and st.button("Previous Page", use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with page_col:
+        st.markdown(f"<div style='text-align:center;'>Page {len(cursors)}</div>", unsafe_allow_html=True)
+    with next_col:
+        if next_cursor is not None and st.button("Next Page", use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
+
+    if not page_df.empty:
         st.subheader("Export Bookstack Data")
-        st.download_button(
-            "Download Filtered Bookstack as CSV",
-            filtered_df.to_csv(index=False).encode("utf-8"),
-            "bookstacks_filtered.csv",
-            "text/csv"
-        )
+        export_format = st.radio("Export format", list(export.FORMATS), horizontal=True)
+        extension, mime = export.FORMATS[export_format]
+        # Built only on request, and dropped once downloaded or when the filters,
+        # format or library change
+        export_key = (tuple(sorted(filters.items())), export_format, db_utils.data_version())
+        prepared = st.session_state.get("stack_export")
+        if prepared is not None and prepared[0] != export_key:
+            st.session_state.pop("stack_export")
+            prepared = None
+        if prepared is None and st.button(f"Prepare {export_format} Export"):
+            with st.spinner("Exporting..."):
+                prepared = (export_key, export.export_bytes(filters, export_format))
+            st.session_state["stack_export"] = prepared
+        if prepared is not None:
+            st.download_button(
+                f"Download Filtered Bookstack as {export_format}",
+                prepared[1],
+                f"bookstacks_filtered.{extension}",
+                mime,
+                on_click=lambda: st.session_state.pop("stack_export", None)
+            )
 
 # =====================
 # Page: Stack Maintenance
@@ -170,10 +202,33 @@ elif page == "Stack Maintenance":
     password = st.text_input("Enter password to manage book stacks:", type="password")
 
     if password == ADMIN_PASSWORD:
-        tab_add, tab_edit, tab_delete = st.tabs(["Add Book", "Edit Book", "Delete Book"])
+        tab_add, tab_edit, tab_delete, tab_import, tab_rebuild, tab_duplicates = st.tabs(
+            ["Add Book", "Edit Book", "Delete Book", "Import Books", "Rebuild Covers", "Find Duplicates"]
+        )
 
         # ---- ADD ----
         with tab_add:
+            def submit_new_book(book):
+                try:
+                    # Saved right away; missing metadata is looked up in the background
+                    db_utils.add_book(
+                        title=book["title"],
+                        author=book["author"],
+                        genre=book["genre"],
+                        year=book["year"],
+                        rating=book["rating"],
+                        isbn=book["isbn"] or None,
+                        subjects=book["subjects"] or None,
+                        cover_url=book["cover_url"] or None,
+                    )
+                    enrichment_queue.wake()
+                    st.session_state.pop("pending_book", None)
+                    st.success(f"Book '{book['title']}' submitted successfully.")
+                    st.rerun()
+                except Exception as e:
+                    st.error("Could not add book.")
+                    st.exception(e)
+
             with st.form("add_book_form", clear_on_submit=True):
                 title = st.text_input("Book Title")
                 author = st.text_input("Author(s)")
@@ -185,47 +240,52 @@ elif page == "Stack Maintenance":
                 cover_url = st.text_input("Cover URL (optional)")
 
                 if st.form_submit_button("Add Book"):
-                    try:
-                        fetched = db_utils.fetch_book_data(title.strip(), author.strip(), isbn.strip() or None)
-                        cover_final = cover_url.strip() or fetched.get("cover_url")
-                        isbn_final = isbn.strip() or fetched.get("isbn")
-                        subjects_final = subjects.strip() or fetched.get("subjects")
-
-                        db_utils.add_book(
-                            title=title.strip(),
-                            author=author.strip(),
-                            genre=genre.strip(),
-                            year=int(year),
-                            rating=float(rating),
-                            isbn=isbn_final,
-                            subjects=subjects_final,
-                            cover_url=cover_final,
-                        )
-                        st.success(f"Book '{title}' submitted successfully.")
-                        st.rerun()
-                    except Exception as e:
-                        st.error("Could not add book.")
-                        st.exception(e)
+                    new_book = {
+                        "title": title.strip(), "author": author.strip(), "genre": genre.strip(),
+                        "year": int(year), "rating": float(rating), "isbn": isbn.strip(),
+                        "subjects": subjects.strip(), "cover_url": cover_url.strip(),
+                    }
+                    # Hold the book back if it looks like one already on the shelves
+                    if dedupe.find_duplicates(new_book["title"], new_book["author"]).empty:
+                        submit_new_book(new_book)
+                    else:
+                        st.session_state["pending_book"] = new_book
+
+            pending = st.session_state.get("pending_book")
+            if pending:
+                st.warning(f"'{pending['title']}' by {pending['author']} looks like a book already in the library:")
+                st.dataframe(dedupe.find_duplicates(pending["title"], pending["author"]),
+                             hide_index=True, use_container_width=True)
+                add_col, cancel_col = st.columns(2)
+                if add_col.button("Add it anyway", use_container_width=True):
+                    submit_new_book(pending)
+                if cancel_col.button("Don't add it", use_container_width=True):
+                    st.session_state.pop("pending_book", None)
+                    st.rerun()
 
         # ---- EDIT ----
         with tab_edit:
-            if df.empty:
-                st.info("No books available to edit.")
-            else:
-                def book_label(row):
-                    year = int(row["year"]) if pd.notna(row["year"]) else "—"
-                    return f'#{int(row["id"])} — {row["title"]} by {row["author"]} ({year})'
-
-                options = {book_label(r): int(r["id"]) for _, r in df.iterrows()}
-                selected_label = st.selectbox("Select a book to edit", list(options.keys()))
-                selected_id = options[selected_label]
-                book_row = df[df["id"] == selected_id].iloc[0]
+            selected_id = ui.book_picker("Select a book to edit", key="edit_book")
+            book_row = db_utils.get_book(selected_id) if selected_id is not None else None
+            if book_row is not None:
+
+                cover_preview = cover_store.local_path(book_row["cover_url"])
+                if cover_preview:
+                    st.image(cover_preview, width=200)
+                job = enrichment_queue.job_status(selected_id)
+                if job and job["status"] != "done":
+                    st.caption(f'Metadata lookup: {job["status"].replace("_", " ")}'
+                               + (f' ({job["last_error"]})' if job["last_error"] else ""))
 
                 with st.form("edit_book_form"):
                     title = st.text_input("Edit Title", value=book_row["title"])
                     author = st.text_input("Edit Author(s)", value=book_row["author"])
-                    year = st.number_input("Edit Year Read", min_value=0, max_value=2100, value=int(book_row["year"]))
-                    rating = st.slider("Edit Rating", 0.0, 5.0, value=float(book_row["rating"]), step=0.1)
+                    # Imported to-read books may have no year or rating; leave them unset unless edited
+                    has_year, has_rating = pd.notna(book_row["year"]), pd.notna(book_row["rating"])
+                    year = st.number_input("Edit Year Read", min_value=0, max_value=2100,
+                                           value=int(book_row["year"]) if has_year else None)
+                    rating = st.slider("Edit Rating", 0.0, 5.0,
+                                       value=float(book_row["rating"]) if has_rating else 0.0, step=0.1)
                     genre = st.text_input("Edit Genre", value=book_row["genre"])
                     isbn = st.text_input("Edit ISBN (optional)", value=book_row["isbn"] or "")
                     subjects = st.text_area("Edit Subjects (optional)", value=book_row["subjects"] or "")
@@ -233,22 +293,18 @@ elif page == "Stack Maintenance":
 
                     if st.form_submit_button("Save Changes"):
                         try:
-                            fetched = db_utils.fetch_book_data(title.strip(), author.strip(), isbn.strip() or None)
-                            cover_final = cover_url.strip() or fetched.get("cover_url")
-                            isbn_final = isbn.strip() or fetched.get("isbn")
-                            subjects_final = subjects.strip() or fetched.get("subjects")
-
                             db_utils.update_book(
                                 book_id=selected_id,
                                 title=title.strip(),
                                 author=author.strip(),
                                 genre=genre.strip(),
-                                year=int(year),
-                                rating=float(rating),
-                                isbn=isbn_final,
-                                subjects=subjects_final,
-                                cover_url=cover_final,
+                                year=int(year) if year is not None else None,
+                                rating=float(rating) if has_rating or rating > 0 else None,
+                                isbn=isbn.strip() or None,
+                                subjects=subjects.strip() or None,
+                                cover_url=cover_url.strip() or None,
                             )
+                            enrichment_queue.wake()
                             st.success(f"Book '{title}' updated successfully.")
                             st.rerun()
                         except Exception as e:
@@ -257,25 +313,94 @@ elif page == "Stack Maintenance":
 
         # ---- DELETE ----
         with tab_delete:
-            if df.empty:
-                st.info("No books available to delete.")
-            else:
-                def book_label_del(row):
-                    year = int(row["year"]) if pd.notna(row["year"]) else "—"
-                    return f'#{int(row["id"])} — {row["title"]} by {row["author"]} ({year})'
-
-                options_del = {book_label_del(r): int(r["id"]) for _, r in df.iterrows()}
-                selected_label_del = st.selectbox("Select a book to delete", list(options_del.keys()))
-
+            selected_id_del = ui.book_picker("Select a book to delete", key="delete_book")
+            if selected_id_del is not None:
                 if st.button("Confirm Delete"):
                     try:
-                        db_utils.delete_book(options_del[selected_label_del])
+                        db_utils.delete_book(selected_id_del)
                         st.warning("Book deleted successfully.")
                         st.rerun()
                     except Exception as e:
                         st.error("Could not delete book.")
                         st.exception(e)
 
+        # ---- IMPORT ----
+        with tab_import:
+            st.write("Import a reading list exported from Goodreads, LibraryThing, or any CSV/JSONL file.")
+            upload = st.file_uploader("Reading list", type=["csv", "jsonl", "ndjson"])
+            if upload is not None and st.button("Import Books"):
+                status = st.empty()
+                try:
+                    report = importer.import_books(
+                        upload,
+                        progress=lambda n, rate: status.write(f"{n} rows imported ({rate:,.0f} rows/s)"),
+                    )
+                    st.success(
+                        f"Imported {report['imported']} books in {report['seconds']:.2f}s "
+                        f"({report['rows_per_sec']:,.0f} rows/s). Skipped {report['skipped']} rows without a title."
+                    )
+                    if report["missing_covers"]:
+                        st.info(f"{report['missing_covers']} books have no cover yet. "
+                                "Use Rebuild Covers with 'Only books without a cover' to fetch them.")
+                except Exception as e:
+                    st.error("Could not import reading list.")
+                    st.exception(e)
+
+        # ---- REBUILD COVERS ----
+        with tab_rebuild:
+            st.write("Refetch covers and subjects for every book. An interrupted rebuild resumes where it stopped.")
+            workers = st.slider("Parallel lookups", 1, db_utils.REBUILD_MAX_WORKERS, value=db_utils.REBUILD_WORKERS)
+            only_missing = st.checkbox("Only books without a cover")
+            if st.button("Rebuild Covers"):
+                progress_bar = st.progress(0.0, text="Starting rebuild...")
+
+                def show_rebuild_progress(done, total, updated):
+                    progress_bar.progress(done / total if total else 1.0,
+                                          text=f"{done}/{total} books checked, {updated} updated")
+
+                try:
+                    updated = db_utils.rebuild_covers(max_workers=workers, progress=show_rebuild_progress,
+                                                     only_missing=only_missing)
+                    st.success(f"Rebuild finished: {updated} books updated.")
+                except Exception as e:
+                    st.error("Rebuild stopped. Run it again to resume.")
+                    st.exception(e)
+
+        # ---- FIND DUPLICATES ----
+        with tab_duplicates:
+            st.write("List books that look like the same title and author entered twice.")
+            threshold = st.slider("Similarity threshold", 0.5, 1.0, value=dedupe.DUPLICATE_THRESHOLD, step=0.05)
+            if st.button("Scan Library"):
+                with st.spinner("Comparing books..."):
+                    report = dedupe.duplicate_report(threshold)
+                if report.empty:
+                    st.success("No likely duplicates found.")
+                else:
+                    st.write(f"{len(report)} likely duplicate pairs in {report['group'].nunique()} groups.")
+                    st.dataframe(report, hide_index=True, use_container_width=True)
+
+        with st.expander("Enrichment Queue", expanded=False):
+            queue_counts = enrichment_queue.summary()
+            q1, q2, q3, q4 = st.columns(4)
+            q1.metric("Waiting", queue_counts["pending"] + queue_counts["running"])
+            q2.metric("Enriched", queue_counts["done"])
+            q3.metric("Not Found", queue_counts["not_found"])
+            q4.metric("Failed", queue_counts["failed"])
+            if queue_counts["failed"] and st.button("Retry Failed Lookups"):
+                st.success(f"Re-queued {enrichment_queue.retry_failed()} lookups.")
+
+        with st.expander("Enrichment Cache", expanded=False):
+            cache_stats = enrichment_cache.stats()
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Hits", cache_stats["hits"])
+            c2.metric("Cached Misses", cache_stats["negative_hits"])
+            c3.metric("Lookups Sent", cache_stats["misses"])
+            c4.metric("Network Time Saved", f'{cache_stats["saved_seconds"]:.1f}s')
+            st.caption(f'{cache_stats["entries"]} entries cached, hit rate {cache_stats["hit_rate"]:.0%}')
+            st.dataframe(pd.DataFrame(providers.stats()), hide_index=True, use_container_width=True)
+            st.caption(f"Provider order comes from {providers.PROVIDERS_ENV} "
+                       "(comma-separated names; leave one out to turn it off).")
+
     else:
         if password:
             st.error("Incorrect password")
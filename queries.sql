@@ -67,21 +67,19 @@ FROM books b
 LEFT JOIN authors a ON b.author_id = a.id
 LEFT JOIN genres g ON b.genre_id = g.id;
 
--- Get average rating per book
-SELECT b.title, ROUND(AVG(r.rating), 2) AS avg_rating
+-- Get average rating per book (book_rating_stats is kept current by triggers on ratings)
+SELECT b.title, ROUND(s.rating_mean, 2) AS avg_rating
 FROM books b
-JOIN ratings r ON b.id = r.book_id
-GROUP BY b.id
+JOIN book_rating_stats s ON b.id = s.book_id
 ORDER BY avg_rating DESC;
 
 -- Get all books with average rating above 4
-SELECT b.title, a.name AS author, g.name AS genre, ROUND(AVG(r.rating),2) AS avg_rating
+SELECT b.title, a.name AS author, g.name AS genre, ROUND(s.rating_mean, 2) AS avg_rating
 FROM books b
 JOIN authors a ON b.author_id = a.id
 JOIN genres g ON b.genre_id = g.id
-JOIN ratings r ON b.id = r.book_id
-GROUP BY b.id
-HAVING avg_rating > 4;
+JOIN book_rating_stats s ON b.id = s.book_id
+WHERE s.rating_mean > 4;
 
 -- Count books per genre
 SELECT g.name AS genre, COUNT(*) AS num_books
@@ -98,10 +96,10 @@ ORDER BY b.year DESC
 LIMIT 10;
 
 -- Find top-rated authors (average rating across their books)
-SELECT a.name AS author, ROUND(AVG(r.rating), 2) AS avg_rating
+SELECT a.name AS author, ROUND(SUM(s.rating_sum) / SUM(s.rating_count), 2) AS avg_rating
 FROM books b
 JOIN authors a ON b.author_id = a.id
-JOIN ratings r ON b.id = r.book_id
+JOIN book_rating_stats s ON b.id = s.book_id
 GROUP BY a.id
 ORDER BY avg_rating DESC;
 
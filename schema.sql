@@ -1,3 +1,16 @@
+-- Base schema. Indexes and later schema changes are applied on top of this
+-- by app/migrations.py, tracked through PRAGMA user_version.
+
+-- Tables the migrations derive from the base tables go too, and user_version
+-- is reset so every migration runs again on the rebuilt data.
+DROP TABLE IF EXISTS book_rating_stats;
+DROP TABLE IF EXISTS books_fts;
+DROP TABLE IF EXISTS book_minhash;
+DROP TABLE IF EXISTS book_lsh;
+DROP TABLE IF EXISTS enrichment_jobs;
+DROP TABLE IF EXISTS rebuild_checkpoint;
+PRAGMA user_version = 0;
+
 DROP TABLE IF EXISTS ratings;
 DROP TABLE IF EXISTS books;
 DROP TABLE IF EXISTS authors;
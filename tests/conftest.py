@@ -0,0 +1,23 @@
+import os
+import sqlite3
+import pytest
+from app import cover_store, db_utils, enrichment_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """A fresh library built from schema.sql and seed.sql, with no metadata providers."""
+    db_path = tmp_path / "books_normalized.db"
+    conn = sqlite3.connect(db_path)
+    for script in ("schema.sql", "seed.sql"):
+        with open(os.path.join(ROOT, script), encoding="utf-8") as f:
+            conn.executescript(f.read())
+    conn.close()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_utils, "DB_PATH", str(db_path))
+    monkeypatch.setattr(enrichment_cache, "CACHE_DB_PATH", str(tmp_path / "enrichment_cache.db"))
+    monkeypatch.setattr(cover_store, "COVER_INDEX_PATH", str(tmp_path / "cover_store.db"))
+    monkeypatch.setenv("ADMIN_PASSWORD", "pw")
+    monkeypatch.setenv("METADATA_PROVIDERS", "none")
+    return db_path
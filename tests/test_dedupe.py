@@ -0,0 +1,24 @@
+import os
+import sqlite3
+from streamlit.testing.v1 import AppTest
+from app import dedupe
+from conftest import ROOT
+
+def test_find_duplicates_unique_title_is_empty(library):
+    found = dedupe.find_duplicates("Zzyzx Unique Qwerty", "Nobody Known")
+    assert found.empty
+    assert list(found.columns) == ["id", "title", "author", "year", "similarity"]
+
+def test_add_book_with_unique_title_is_saved(library):
+    at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=60)
+    at.session_state["page"] = "Stack Maintenance"
+    at.run()
+    at.text_input[0].input("pw").run()
+    fields = {w.label: w for w in at.text_input}
+    fields["Book Title"].input("Zzyzx Unique Qwerty")
+    fields["Author(s)"].input("Nobody Known")
+    next(b for b in at.button if b.label == "Add Book").click().run()
+
+    assert not at.exception
+    with sqlite3.connect(library) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM books WHERE title = 'Zzyzx Unique Qwerty'").fetchone()[0] == 1
@@ -0,0 +1,40 @@
+import time
+from app import db_utils, enrichment_queue, providers
+
+def _use_provider(monkeypatch, provider):
+    monkeypatch.delenv("METADATA_PROVIDERS", raising=False)
+    monkeypatch.setattr(providers, "_registry", {"stub": provider})
+
+def _make_due(book_id):
+    with db_utils.connection() as conn:
+        conn.execute("UPDATE enrichment_jobs SET next_attempt_at = 0 WHERE book_id = ?", (book_id,))
+        conn.commit()
+
+def test_provider_outage_is_retried_not_marked_not_found(library, monkeypatch):
+    def offline(title, author, isbn):
+        raise ConnectionError("network down")
+
+    _use_provider(monkeypatch, offline)
+    book_id = db_utils.add_book("Zzyzx Unique Qwerty", "Nobody Known", "", 2025, 4.0)
+    assert enrichment_queue.drain() == 1
+
+    job = enrichment_queue.job_status(book_id)
+    assert job["status"] == "pending"
+    assert job["next_attempt_at"] > time.time()
+    assert "providers unavailable" in job["last_error"]
+
+    # Once the provider answers, a miss is final and the placeholder is stored
+    _use_provider(monkeypatch, lambda title, author, isbn: None)
+    _make_due(book_id)
+    assert enrichment_queue.drain() == 1
+    assert enrichment_queue.job_status(book_id)["status"] == "not_found"
+
+def test_found_metadata_fills_only_empty_fields(library, monkeypatch):
+    _use_provider(monkeypatch, lambda title, author, isbn: {
+        "cover_url": "https://example.com/cover.jpg", "isbn": "9780000000001", "subjects": "Fiction"})
+    book_id = db_utils.add_book("Zzyzx Unique Qwerty", "Nobody Known", "", 2025, 4.0, isbn="123")
+    enrichment_queue.drain()
+
+    book = db_utils.get_book(book_id)
+    assert enrichment_queue.job_status(book_id)["status"] == "done"
+    assert (book["cover_url"], book["isbn"], book["subjects"]) == ("https://example.com/cover.jpg", "123", "Fiction")
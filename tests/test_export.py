@@ -0,0 +1,39 @@
+import io
+import os
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+from streamlit.testing.v1 import AppTest
+from app import db_utils, export
+from conftest import ROOT
+
+READERS = {
+    "CSV": lambda data: pa_csv.read_csv(io.BytesIO(data)),
+    "Parquet": lambda data: pq.read_table(io.BytesIO(data)),
+    "Arrow": lambda data: pa.ipc.open_file(io.BytesIO(data)).read_all(),
+}
+
+@pytest.mark.parametrize("fmt", list(export.FORMATS))
+def test_export_matches_filtered_books(library, monkeypatch, fmt):
+    # Several chunks, so the writer sees more than one batch
+    monkeypatch.setattr(db_utils, "EXPORT_CHUNK_ROWS", 3)
+    year = str(db_utils.get_books()["year"].mode()[0])
+    filters = {"search": "", "genre": "All", "year": year}
+    expected, _ = db_utils.get_books_page(filters, limit=None)
+
+    table = READERS[fmt](export.export_bytes(filters, fmt))
+    assert table.num_rows == len(expected) > 0
+    assert table.column("id").to_pylist() == expected["id"].tolist()
+
+def test_prepared_export_is_dropped_when_leaving_bookstacks(library):
+    at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=60)
+    at.session_state["page"] = "Bookstacks"
+    at.run()
+    next(b for b in at.button if b.label == "Prepare CSV Export").click().run()
+    assert not at.exception
+    assert "stack_export" in at.session_state
+
+    at.button(key="Library").click().run()
+    assert not at.exception
+    assert "stack_export" not in at.session_state
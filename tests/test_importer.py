@@ -0,0 +1,31 @@
+import io
+import os
+import sqlite3
+from streamlit.testing.v1 import AppTest
+from app import importer
+from conftest import ROOT
+
+GOODREADS_TO_READ = (
+    "Title,Author,My Rating,ISBN13,Date Read,Exclusive Shelf\n"
+    'Zzyzx Unread Qwerty,Nobody Known,0,="",,to-read\n'
+)
+
+def test_to_read_row_can_be_edited(library):
+    report = importer.import_books(io.StringIO(GOODREADS_TO_READ), fmt="csv")
+    assert report["imported"] == 1
+
+    at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=60)
+    at.session_state["page"] = "Stack Maintenance"
+    at.run()
+    at.text_input[0].input("pw").run()
+    at.text_input(key="edit_book_search").input("Zzyzx Unread").run()
+    assert not at.exception
+    assert [w.value for w in at.text_input if w.label == "Edit Title"] == ["Zzyzx Unread Qwerty"]
+
+    # Saving without touching year or rating keeps them unset
+    next(b for b in at.button if b.label == "Save Changes").click().run()
+    assert not at.exception
+    with sqlite3.connect(library) as conn:
+        book_id, year = conn.execute("SELECT id, year FROM books WHERE title = 'Zzyzx Unread Qwerty'").fetchone()
+        ratings = conn.execute("SELECT COUNT(*) FROM ratings WHERE book_id = ?", (book_id,)).fetchone()[0]
+    assert (year, ratings) == (None, 0)
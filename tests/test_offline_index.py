@@ -0,0 +1,42 @@
+import os
+import pytest
+from app import offline_index
+from conftest import ROOT
+
+FIXTURES = os.path.join(ROOT, "tests", "fixtures")
+DUMPS = [os.path.join(FIXTURES, "ol_dump_sample.txt"), os.path.join(FIXTURES, "ol_dump_sample_editions.txt.gz")]
+
+def _cover(cover_id):
+    return f"https://covers.openlibrary.org/b/id/{cover_id}-L.jpg"
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index_path = str(tmp_path / "openlibrary_index.db")
+    report = offline_index.build(DUMPS, index_path)
+    monkeypatch.setattr(offline_index, "INDEX_PATH", index_path)
+    return report
+
+def test_build_reads_plain_and_gzipped_dumps(index):
+    # The redirect and the unparseable work are skipped
+    assert {k: index[k] for k in ("authors", "works", "editions", "isbns")} == {
+        "authors": 2, "works": 2, "editions": 3, "isbns": 3}
+    # Both works, plus the edition that has no work
+    assert index["titles"] == 3
+
+def test_lookup_by_isbn_10_and_13(index):
+    found = offline_index.lookup("", None, "0-441-47812-3")
+    assert found == {"cover_url": _cover(222), "isbn": "0-441-47812-3", "subjects": "Science fiction, Gender"}
+
+    # Indexed from the edition's isbn_10, looked up as ISBN-13
+    found = offline_index.lookup("", None, "9780553383041")
+    assert found == {"cover_url": _cover(333), "isbn": "9780553383041", "subjects": "Wizards"}
+
+def test_lookup_by_title_and_author(index):
+    # The work's cover was deleted, so an edition's is used
+    found = offline_index.lookup("The Hobbit", "J. R. R. Tolkien", None)
+    assert found == {"cover_url": _cover(444), "isbn": "9780547928210", "subjects": "Fantasy"}
+
+    found = offline_index.lookup("a wizard of earthsea", "Ursula K. Le Guin", None)
+    assert found["cover_url"] == _cover(333)
+
+    assert offline_index.lookup("The Hobbit", "Ursula K. Le Guin", None) is None
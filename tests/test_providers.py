@@ -0,0 +1,29 @@
+import time
+from app import http_client, providers
+
+def _slow_miss(title, author, isbn):
+    time.sleep(0.6)
+    return None
+
+def _hit(title, author, isbn):
+    return {"cover_url": "https://covers.example/hit.jpg"}
+
+def test_hedging_at_the_in_flight_cap_does_not_spin(monkeypatch):
+    monkeypatch.delenv("METADATA_PROVIDERS", raising=False)
+    monkeypatch.setenv(providers.HEDGE_DELAY_ENV, "0.05")
+    monkeypatch.setattr(providers, "_registry", {"slow_a": _slow_miss, "slow_b": _slow_miss, "fast": _hit})
+    calls = []
+    real_wait = providers.wait
+
+    def counting_wait(*args, **kwargs):
+        calls.append(kwargs.get("timeout"))
+        return real_wait(*args, **kwargs)
+
+    monkeypatch.setattr(providers, "wait", counting_wait)
+
+    # Both slow providers hold the cap long after the next hedge is due
+    with http_client.deadline(5):
+        book = providers.lookup("Zzyzx Unique Qwerty", "Nobody Known", None)
+
+    assert book["cover_url"] == "https://covers.example/hit.jpg"
+    assert len(calls) < 10
@@ -0,0 +1,35 @@
+import sqlite3
+from app import db_utils, providers
+
+def test_books_without_isbn_keep_their_own_covers(library, monkeypatch):
+    asked = []
+
+    def by_title(title, author, isbn):
+        asked.append(isbn)
+        return {"cover_url": f"https://example.com/{title}.jpg", "isbn": None, "subjects": None}
+
+    passed = []
+    fetch_book_data = db_utils.fetch_book_data
+
+    def recording_fetch(title, author, isbn):
+        passed.append(isbn)
+        return fetch_book_data(title, author, isbn)
+
+    monkeypatch.delenv("METADATA_PROVIDERS", raising=False)
+    monkeypatch.setattr(providers, "_registry", {"stub": by_title})
+    monkeypatch.setattr(db_utils, "fetch_book_data", recording_fetch)
+    with sqlite3.connect(library) as conn:
+        # With text and NULL mixed in the column, pandas reads the missing ISBNs as NaN
+        conn.execute("UPDATE books SET isbn = '9780441013593' WHERE id = (SELECT MIN(id) FROM books)")
+        no_isbn = conn.execute("SELECT COUNT(*) FROM books WHERE isbn IS NULL").fetchone()[0]
+    assert no_isbn > 1
+
+    db_utils.rebuild_covers(max_workers=4)
+
+    with sqlite3.connect(library) as conn:
+        rows = conn.execute("SELECT title, isbn, cover_url FROM books").fetchall()
+    assert all(cover == f"https://example.com/{title}.jpg" for title, _, cover in rows)
+    assert not any(isbn == "nan" for _, isbn, _ in rows)
+    # Missing ISBNs reach the lookup as None, not pandas' NaN
+    assert not any(isinstance(isbn, float) for isbn in passed)
+    assert "nan" not in [str(isbn) for isbn in asked]